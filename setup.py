@@ -44,6 +44,7 @@ with open('README.rst') as f:
     LONG_DESCRIPTION = f.read()
 
 requirements = [
+    'futures>=3.0; python_version < "3"',
     'Jinja2>=2.7',
     'PyYAML>=3.10',
     'click>=6.0,<7.0',
@@ -54,10 +55,15 @@ requirements = [
     'simplejson==3.4.0',
 ]
 
+async_requirements = [
+    'aiohttp>=3.0',
+]
+
 testing_requirements = [
     'coveralls',
     'pep8',
     'pylint<=1.2.0',
+    'pytest',
 ]
 
 if __name__ == '__main__':
@@ -78,12 +84,14 @@ if __name__ == '__main__':
         install_requires=requirements,
         dependency_links=[],
         extras_require={
+            'async': async_requirements,
             'testing': testing_requirements,
         },
         entry_points={
             'console_scripts': [
                 'stackdio-cli=stackdio.cli:main',
                 'blueprint-generator=stackdio.cli.blueprints:main',
+                'stackdio-bench=stackdio.cli.bench:main',
             ],
         },
         classifiers=[
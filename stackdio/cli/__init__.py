@@ -5,26 +5,51 @@ import os
 import click
 import click_shell
 
-from stackdio.cli.mixins import blueprints, formulas, stacks
-from stackdio.cli.utils import pass_client
+from stackdio.cli.id_cache import META_KEY, IdCache
+from stackdio.cli.utils import LazyShell, pass_client
 from stackdio.client import StackdioClient
 from stackdio.client.config import CFG_DIR
+from stackdio.client.metrics import format_table
 from stackdio.client.version import __version__
 
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
 
-@click_shell.shell(context_settings=CONTEXT_SETTINGS, prompt='stackdio > ',
+# The subcommand groups are only imported when they're used, since some of them pull in
+# slow imports (jinja2, yaml) that most commands never need
+LAZY_COMMANDS = {
+    'blueprints': 'stackdio.cli.mixins.blueprints:blueprints',
+    'formulas': 'stackdio.cli.mixins.formulas:formulas',
+    'stacks': 'stackdio.cli.mixins.stacks:stacks',
+}
+
+
+@click_shell.shell(cls=LazyShell, lazy_commands=LAZY_COMMANDS,
+                   context_settings=CONTEXT_SETTINGS, prompt='stackdio > ',
                    intro='stackdio-cli, v{0}'.format(__version__))
 @click.version_option(__version__, '-v', '--version')
 @click.option('-c', '--config-dir', help='The config directory to use.',
               type=click.Path(dir_okay=True, file_okay=False), default=CFG_DIR,
               envvar='STACKDIO_CONFIG_DIR')
+@click.option('--no-cache', is_flag=True, default=False,
+              help='Don\'t use the on-disk response or title lookup caches.')
+@click.option('--stats', is_flag=True, default=False,
+              help='Print request timings for each endpoint when finished.')
 @click.pass_context
-def stackdio(ctx, config_dir):
+def stackdio(ctx, config_dir, no_cache, stats):
     # Create a client instance
-    client = StackdioClient(cfg_file=os.path.join(config_dir, 'client.cfg'))
+    client = StackdioClient(cfg_file=os.path.join(config_dir, 'client.cfg'),
+                            disk_cache=not no_cache)
+
+    # Remembers which id each stack / blueprint / formula title maps to between runs
+    ctx.meta[META_KEY] = IdCache.for_client(client, enabled=not no_cache)
+
+    # Release the pooled connections once the command is done
+    ctx.call_on_close(client.close)
+
+    if stats:
+        ctx.call_on_close(lambda: click.echo(format_table(client.metrics()), err=True))
 
     # Set this hist file
     ctx.command.hist_file = os.path.join(config_dir, 'cli-history')
@@ -56,12 +81,6 @@ def server_version(client):
     click.echo('stackdio-server, version {0}'.format(client.get_version()))
 
 
-# Add all our other commands
-stackdio.add_command(blueprints.blueprints)
-stackdio.add_command(stacks.stacks)
-stackdio.add_command(formulas.formulas)
-
-
 def main():
     # Just run our CLI tool
     stackdio()
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Drives workloads through StackdioClient and reports throughput, latency, connection counts
+and memory as JSON, so client releases and tuning settings can be compared.
+
+    stackdio-bench --local --latency 0.02 -w list-stacks -w stack-hosts -c 20
+    stackdio-bench --in-process -w get-stack -n 50000
+    stackdio-bench --url https://stackdio.example.com/api/ -w list-stacks
+    stackdio-bench --startup
+"""
+
+from __future__ import division
+
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from stackdio.client import StackdioClient
+from stackdio.client.config import CFG_DIR
+from stackdio.client.metrics import percentile
+from stackdio.client.transport import TRANSPORTS
+from stackdio.client.version import __version__
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+
+CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+
+WORKLOADS = {}
+
+
+class Workload(object):
+    """
+    A named operation to run over and over.  ``setup`` runs once before timing starts and
+    returns the state passed to each ``run``.
+    """
+
+    def __init__(self, name, run, setup=None, writes=False):
+        super(Workload, self).__init__()
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda client: None)
+        self.writes = writes
+
+
+def workload(name, setup=None, writes=False):
+    """
+    Register a workload.  Workloads that write to the server are only run against a real
+    server with --allow-writes.
+    """
+    def decorator(func):
+        WORKLOADS[name] = Workload(name, func, setup, writes)
+        return func
+    return decorator
+
+
+class Cycle(object):
+    """
+    A thread safe round robin over a list
+    """
+
+    def __init__(self, items):
+        super(Cycle, self).__init__()
+        if not items:
+            raise click.UsageError('There is nothing on the server to run this workload on.')
+        self._items = itertools.cycle(items)
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            return next(self._items)
+
+
+def stack_ids(client):
+    return Cycle([stack['id'] for stack in client.list_stacks()])
+
+
+@workload('get-stack', setup=stack_ids)
+def get_stack(client, stacks):
+    client.get_stack(stacks.next())
+
+
+@workload('list-stacks')
+def list_stacks(client, _):
+    client.list_stacks()
+
+
+@workload('stack-hosts')
+def stack_hosts(client, _):
+    # The "fetch everything" pattern - one list, then one request per stack
+    stacks = client.list_stacks()
+    for result in client.map(client.get_stack_hosts, [s['id'] for s in stacks]):
+        result.get()
+
+
+def run_commands(client):
+    stacks = client.list_stacks()
+    if not stacks:
+        return Cycle([])
+    command_ids = [client.run_command(stack['id'], '*', 'true')['id'] for stack in stacks[:5]]
+    return Cycle(command_ids)
+
+
+@workload('poll-commands', setup=run_commands, writes=True)
+def poll_commands(client, commands):
+    client.get_command(commands.next())
+
+
+def pick_blueprint(client):
+    blueprints = client.list_blueprints()
+    if not blueprints:
+        raise click.UsageError('launch-delete needs at least one blueprint on the server.')
+    return {'blueprint': blueprints[0]['id'], 'count': itertools.count()}
+
+
+@workload('launch-delete', setup=pick_blueprint, writes=True)
+def launch_delete(client, state):
+    stack = client.create_stack({
+        'blueprint': state['blueprint'],
+        'title': 'stackdio-bench-{0}-{1}'.format(os.getpid(), next(state['count'])),
+        'description': 'Created by stackdio-bench',
+    })
+    client.delete_stack(stack['id'])
+
+
+def count_connections(transport):
+    """
+    The number of connections the transport's pools have opened so far, or None if the
+    transport doesn't pool urllib3 connections
+    """
+    if hasattr(transport, 'session'):
+        managers = [adapter.poolmanager for adapter in transport.session.adapters.values()]
+    elif hasattr(transport, 'pools'):
+        managers = list(transport.pools.values())
+    else:
+        return None
+
+    total = 0
+    seen = set()
+    for manager in managers:
+        if id(manager) in seen:
+            continue
+        seen.add(id(manager))
+        for key in manager.pools.keys():
+            total += manager.pools[key].num_connections
+    return total
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+# CLI invocations timed by --startup
+STARTUP_COMMANDS = (
+    ('--help',),
+    ('--version',),
+    ('server-version',),
+    ('stacks', 'list'),
+    ('blueprints', '--help'),
+)
+
+CLI_SCRIPT = 'from stackdio.cli import main; main()'
+
+
+def parse_importtime(output, top=10):
+    """
+    Summarize the output of ``python -X importtime``
+
+    :return: the total import time in seconds, and the slowest modules by their own time
+    :rtype: tuple
+    """
+    modules = []
+    total = 0
+
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+
+        # Only top level imports count towards the total, the rest are already included
+        if not name[1:].startswith(' '):
+            total += int(cumulative_us)
+
+        modules.append((int(self_us), name.strip()))
+
+    slowest = sorted(modules, reverse=True)[:top]
+
+    return total / 1e6, [{'module': name, 'self': us / 1e6} for us, name in slowest]
+
+
+def time_command(args, repeat, env):
+    command = [sys.executable, '-c', CLI_SCRIPT] + list(args)
+
+    times = []
+    returncode = None
+
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(repeat):
+            start = time.time()
+            returncode = subprocess.call(command, env=env, stdout=devnull, stderr=devnull)
+            times.append(time.time() - start)
+
+    times.sort()
+
+    result = {
+        'returncode': returncode,
+        'wall': {
+            'min': times[0],
+            'p50': percentile(times, 50),
+            'max': times[-1],
+        },
+        'import_time': None,
+        'slowest_imports': None,
+    }
+
+    # -X importtime is python 3.7+
+    if sys.version_info >= (3, 7):
+        proc = subprocess.Popen([sys.executable, '-X', 'importtime'] + command[1:], env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        _, err = proc.communicate()
+        result['import_time'], result['slowest_imports'] = parse_importtime(err)
+
+    return result
+
+
+def run_startup(repeat):
+    """
+    Time stackdio-cli invocations in fresh processes, against a stand-in server so the
+    network isn't part of the measurement
+    """
+    from stackdio.testing import FakeStackdio, serve
+
+    server = serve(FakeStackdio())
+    config_dir = tempfile.mkdtemp(prefix='stackdio-bench-')
+
+    try:
+        with open(os.path.join(config_dir, 'client.cfg'), 'w') as f:
+            f.write('[stackdio]\nurl = {0}\nusername = test\nblueprint_dir = {1}\n'.format(
+                server.url, config_dir))
+
+        env = dict(os.environ, STACKDIO_CONFIG_DIR=config_dir, STACKDIO_PASSWORD='password')
+
+        return dict((' '.join(args), time_command(args, repeat, env))
+                    for args in STARTUP_COMMANDS)
+    finally:
+        server.shutdown()
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+
+def run_workload(client, bench, operations, concurrency, warmup):
+    state = bench.setup(client)
+
+    for _ in range(warmup):
+        bench.run(client, state)
+
+    client.reset_metrics()
+    connections_before = count_connections(client.transport)
+
+    def timed(_):
+        start = time.time()
+        try:
+            bench.run(client, state)
+            return time.time() - start, None
+        except Exception as e:  # pylint: disable=broad-except
+            return time.time() - start, '{0}: {1}'.format(type(e).__name__, e)
+
+    start = time.time()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(timed, range(operations)))
+    else:
+        results = [timed(i) for i in range(operations)]
+    duration = time.time() - start
+
+    latencies = sorted(r[0] for r in results)
+    errors = [r[1] for r in results if r[1] is not None]
+    connections_after = count_connections(client.transport)
+
+    requests = sum(m['requests'] for m in client.metrics().values())
+
+    return {
+        'operations': operations,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'duration': duration,
+        'throughput': operations / duration if duration else None,
+        'requests': requests,
+        'requests_per_second': requests / duration if duration else None,
+        'latency': {
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else None,
+        },
+        'connections': (connections_after - connections_before
+                        if connections_before is not None else None),
+        'endpoints': client.metrics(),
+    }
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('-w', '--workload', 'workloads', multiple=True,
+              type=click.Choice(sorted(WORKLOADS)),
+              help='The workload to run.  May be given more than once.  [default: all the '
+                   'read only workloads]')
+@click.option('-n', '--operations', type=int, default=200, show_default=True,
+              help='The number of operations to run for each workload.')
+@click.option('-c', '--concurrency', type=int, default=1, show_default=True,
+              help='The number of threads issuing operations.')
+@click.option('--warmup', type=int, default=5, show_default=True,
+              help='Untimed operations to run first for each workload.')
+@click.option('--url', help='The api url to benchmark against.  [default: the url in the '
+                            'client config]')
+@click.option('--local', is_flag=True, default=False,
+              help='Benchmark against a stand-in server started on localhost.')
+@click.option('--in-process', is_flag=True, default=False,
+              help='Call a stand-in server in-process, which measures the overhead of the '
+                   'client itself.')
+@click.option('--stacks', type=int, default=50, show_default=True,
+              help='The number of stacks on the stand-in server.')
+@click.option('--page-size', type=int, default=100, show_default=True,
+              help='The page size of the stand-in server.')
+@click.option('--latency', type=float, default=0.0, show_default=True,
+              help='Seconds of latency the stand-in server adds to every response.')
+@click.option('--transport', type=click.Choice(sorted(TRANSPORTS)),
+              help='The transport to use.')
+@click.option('--pool-maxsize', type=int,
+              help='Connections to keep per host.  [default: the concurrency]')
+@click.option('--allow-writes', is_flag=True, default=False,
+              help='Allow workloads that create & delete things on a real server.')
+@click.option('--config-dir', type=click.Path(dir_okay=True, file_okay=False),
+              default=CFG_DIR, envvar='STACKDIO_CONFIG_DIR',
+              help='The config directory to read the url & credentials from.')
+@click.option('--startup', is_flag=True, default=False,
+              help='Time stackdio-cli startup for some common commands instead of running '
+                   'workloads.')
+@click.option('--repeat', type=int, default=5, show_default=True,
+              help='How many times to run each command with --startup.')
+@click.option('-o', '--output', type=click.File('w'), default='-',
+              help='Where to write the JSON report.  [default: stdout]')
+def main(workloads, operations, concurrency, warmup, url, local, in_process, stacks,
+         page_size, latency, transport, pool_maxsize, allow_writes, config_dir, startup,
+         repeat, output):
+    """
+    Benchmark the stackdio client
+    """
+    if startup:
+        report = {
+            'client_version': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'startup': run_startup(repeat),
+        }
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write('\n')
+        return
+
+    if local and in_process:
+        raise click.UsageError('--local and --in-process can\'t be used together.')
+
+    fake = local or in_process
+    server = None
+
+    client_kwargs = {
+        'cfg_file': os.path.join(config_dir, 'client.cfg'),
+        'pool_maxsize': pool_maxsize or max(concurrency, 10),
+        'disk_cache': False,
+    }
+
+    if fake:
+        # Only imported here so a plain benchmark doesn't pay for it
+        from stackdio.testing import FakeStackdio, fake_client, serve
+
+        app = FakeStackdio(stacks=stacks, page_size=page_size, latency=latency)
+
+        if in_process:
+            client = fake_client(app, **client_kwargs)
+            target = 'in-process'
+        else:
+            server = serve(app)
+            client = StackdioClient(url=server.url, username='test', password='password',
+                                    transport=transport, **client_kwargs)
+            target = server.url
+    else:
+        client = StackdioClient(url=url, transport=transport, **client_kwargs)
+        if not client.usable():
+            raise click.UsageError('No url & credentials found.  Pass --url, run '
+                                   '`stackdio-cli configure`, or use --local.')
+        target = client.url
+
+    if not workloads:
+        workloads = sorted(name for name, w in WORKLOADS.items() if not w.writes)
+
+    if not fake and not allow_writes:
+        writers = [name for name in workloads if WORKLOADS[name].writes]
+        if writers:
+            raise click.UsageError('{0} would modify {1}, pass --allow-writes if that\'s '
+                                   'ok.'.format(', '.join(writers), target))
+
+    report = {
+        'client_version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'target': target,
+        'transport': type(client.transport).__name__,
+        'concurrency': concurrency,
+        'pool_maxsize': client.pool_maxsize,
+        'workloads': {},
+    }
+
+    try:
+        for name in workloads:
+            click.echo('Running {0}...'.format(name), err=True)
+            report['workloads'][name] = run_workload(client, WORKLOADS[name], operations,
+                                                     concurrency, warmup)
+    finally:
+        client.close()
+        if server is not None:
+            server.shutdown()
+
+    report['peak_rss_kb'] = peak_rss_kb()
+
+    json.dump(report, output, indent=2, sort_keys=True)
+    output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
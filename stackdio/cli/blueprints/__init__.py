@@ -6,27 +6,122 @@ import sys
 
 import click
 
-from stackdio.cli.blueprints.generator import BlueprintException, BlueprintGenerator
+from stackdio.cli.blueprints.batch import load_manifest, load_mappings, render_all
+from stackdio.cli.blueprints.generator import (TEMPLATE_CACHE_DIR, BlueprintException,
+                                                BlueprintGenerator)
 
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
 
+def write_output(path, blueprint):
+    dirname = os.path.dirname(path)
+
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+
+    with open(path, 'w') as f:
+        f.write(json.dumps(blueprint, indent=2))
+        f.write('\n')
+
+
+def run_batch(templates_path, entries, cache_dir, jobs, output_dir):
+    """
+    Render a batch of entries.  Entries with an output path (or every entry, if there's an
+    output directory) are written to files, and the rest are written to stdout as one json
+    object per line.
+    """
+    failures = []
+
+    for entry, blueprint, error, warnings in render_all(templates_path, entries, cache_dir,
+                                                        jobs):
+        for warning in warnings:
+            click.secho('WARNING: {0}: {1}'.format(entry['name'], warning), fg='magenta',
+                        err=True)
+
+        output = entry['output']
+
+        if output is None and output_dir is not None:
+            output = '{0}.json'.format(entry['name'])
+
+        if error is not None:
+            failures.append((entry['name'], error))
+        elif output is not None:
+            write_output(os.path.join(output_dir or os.path.curdir, output), blueprint)
+        else:
+            click.echo(json.dumps({'name': entry['name'], 'blueprint': blueprint}))
+
+    click.echo('Rendered {0} of {1} blueprint(s)'.format(len(entries) - len(failures),
+                                                        len(entries)), err=True)
+
+    for name, error in failures:
+        click.secho('{0} failed:'.format(name), fg='red', err=True)
+        for line in error.splitlines():
+            click.echo('    {0}'.format(line), err=True)
+
+    if failures:
+        sys.exit(1)
+
+
 @click.command(context_settings=CONTEXT_SETTINGS)
-@click.argument('template_file')
+@click.argument('template_file', required=False)
 @click.argument('var_files', nargs=-1, type=click.File('r'))
 @click.option('-p', '--prompt', is_flag=True, default=False,
               help='Prompt user for missing variables')
 @click.option('-d', '--debug', is_flag=True, default=False,
               help='Print out json string before parsing the json')
-def main(template_file, var_files, prompt, debug):
+@click.option('--cache-dir', type=click.Path(file_okay=False), default=TEMPLATE_CACHE_DIR,
+              envvar='STACKDIO_TEMPLATE_CACHE', show_default=True,
+              help='Where to cache compiled templates')
+@click.option('--no-cache', is_flag=True, default=False,
+              help='Compile the templates from scratch, without the cache')
+@click.option('-m', '--manifest', type=click.Path(exists=True, dir_okay=False),
+              help='Render every entry in a yaml / json manifest instead of a single template')
+@click.option('--mappings', type=click.Path(exists=True, dir_okay=False),
+              help='Render every entry in a blueprint directory\'s mappings.yaml instead of a '
+                   'single template')
+@click.option('-j', '--jobs', type=click.INT, default=1,
+              help='The number of processes to render a batch with.  0 means one per CPU.')
+@click.option('-o', '--output-dir', type=click.Path(file_okay=False),
+              help='Write each blueprint in a batch to a file in this directory instead of '
+                   'to stdout')
+def main(template_file, var_files, prompt, debug, cache_dir, no_cache, manifest, mappings,
+         jobs, output_dir):
+    """
+    Render a blueprint template, or a batch of them with --manifest or --mappings.  A batch
+    is written to stdout as one json object per line, unless the entries say where to go.
+    """
+    if no_cache:
+        cache_dir = None
+
+    if manifest or mappings:
+        if manifest and mappings:
+            raise click.UsageError('Only one of --manifest and --mappings may be given')
+        if template_file or var_files:
+            raise click.UsageError('A template can\'t be given along with a batch')
+
+        try:
+            if manifest:
+                templates_path, entries = load_manifest(manifest)
+            else:
+                templates_path, entries = load_mappings(mappings)
+        except BlueprintException as e:
+            raise click.UsageError(str(e))
+
+        run_batch(templates_path + [os.path.curdir], entries, cache_dir, jobs or None,
+                  output_dir)
+        return
+
+    if not template_file:
+        raise click.UsageError('Missing argument "template_file".')
 
     try:
         # Throw all output to stderr
         gen = BlueprintGenerator([os.path.curdir,
                                   os.path.join(os.path.curdir, 'templates'),
                                   os.path.dirname(os.path.abspath(template_file))],
-                                 output_stream=sys.stderr)
+                                 output_stream=sys.stderr,
+                                 cache_dir=cache_dir)
 
         # Generate the blueprint
         blueprint = gen.generate(template_file,
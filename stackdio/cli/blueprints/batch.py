@@ -0,0 +1,160 @@
+from __future__ import print_function, unicode_literals
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from stackdio.cli.blueprints.generator import (BlueprintException, BlueprintGenerator,
+                                               load_yaml_file)
+from stackdio.client.compat import StringIO
+
+
+# The generator for the current process, and the arguments it was built with.  Building one
+# means building a jinja2 environment, so it's kept for every entry the process renders.
+_generator = None
+_generator_args = None
+
+
+def load_manifest(path):
+    """
+    Load the entries to render from a manifest.  The manifest is a yaml (or json) list of
+    entries like::
+
+        - template: hadoop.json
+          var_files: [common.yaml, hadoop.yaml]
+          variables: {title: hadoop-dev}
+          output: hadoop-dev.json
+
+    Only ``template`` is required.  Templates are looked up relative to the manifest's
+    directory (and its ``templates`` directory), and var files relative to the manifest's
+    directory.
+
+    :param path: The path of the manifest
+    :return: the template search path, and the list of entries
+    :rtype: tuple
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    manifest = load_yaml_file(path) or []
+
+    if not isinstance(manifest, list):
+        raise BlueprintException('The manifest must be a list of entries')
+
+    entries = []
+
+    for index, entry in enumerate(manifest):
+        if not isinstance(entry, dict) or not entry.get('template'):
+            raise BlueprintException('Entry {0} of the manifest has no template'.format(index))
+
+        variables = entry.get('variables') or {}
+        default_name = os.path.splitext(os.path.basename(entry['template']))[0]
+
+        entries.append({
+            'name': entry.get('name') or variables.get('title') or default_name,
+            'template': entry['template'],
+            'var_files': [os.path.join(base_dir, var_file)
+                          for var_file in entry.get('var_files') or []],
+            'variables': variables,
+            'output': entry.get('output'),
+        })
+
+    return [base_dir, os.path.join(base_dir, 'templates')], entries
+
+
+def load_mappings(path):
+    """
+    Load the entries to render from a blueprint directory's mappings.yaml, the same way
+    ``stackdio-cli blueprints create-all`` does.  Each blueprint is named (and titled) after
+    its key in the file.
+
+    :param path: The path of mappings.yaml
+    :return: the template search path, and the list of entries
+    :rtype: tuple
+    """
+    blueprint_dir = os.path.dirname(os.path.abspath(path))
+
+    mappings = load_yaml_file(path) or {}
+
+    entries = []
+
+    for name, vals in sorted(mappings.items()):
+        entries.append({
+            'name': name,
+            'template': vals.get('template'),
+            'var_files': [os.path.join(blueprint_dir, 'var_files', var_file)
+                          for var_file in vals.get('var_files') or []],
+            'variables': {'title': name},
+            'output': None,
+        })
+
+    return [os.path.join(blueprint_dir, 'templates')], entries
+
+
+def render_entry(templates_path, cache_dir, entry):
+    """
+    Render one entry.  Generator output (warnings & errors) is captured rather than printed,
+    and var files that don't exist are skipped with a warning.
+
+    :param templates_path: The directories to look for templates in
+    :param cache_dir: Where to cache compiled templates, or None
+    :param entry: The entry to render
+    :return: the entry, the blueprint (or None), the error output if it failed, and the list
+             of warnings to show whether or not it failed
+    :rtype: tuple
+    """
+    global _generator, _generator_args  # pylint: disable=global-statement
+
+    if _generator is None or _generator_args != (templates_path, cache_dir):
+        # The generator adds to the list it's given, so hand it a copy
+        _generator = BlueprintGenerator(list(templates_path), cache_dir=cache_dir)
+        _generator_args = (templates_path, cache_dir)
+
+    _generator.out_stream = StringIO()
+
+    var_files = []
+    warnings = []
+
+    for var_file in entry['var_files']:
+        if os.path.exists(var_file):
+            var_files.append(var_file)
+        else:
+            warnings.append('Variable file {0} was not found.  Ignoring.'.format(var_file))
+
+    try:
+        blueprint = _generator.generate(entry['template'],
+                                        var_files,
+                                        variables=entry['variables'],
+                                        suppress_warnings=True)
+    except BlueprintException:
+        blueprint = None
+    except Exception as e:  # pylint: disable=broad-except
+        return entry, None, '{0}: {1}'.format(e.__class__.__name__, e), warnings
+
+    if blueprint is None:
+        error = _generator.out_stream.getvalue().strip() or 'Render failed'
+        return entry, None, error, warnings
+
+    return entry, blueprint, None, warnings
+
+
+def render_all(templates_path, entries, cache_dir=None, jobs=1):
+    """
+    Render every entry, on a pool of processes if jobs isn't 1
+
+    :param templates_path: The directories to look for templates in
+    :param entries: The entries to render
+    :param cache_dir: Where to cache compiled templates, or None
+    :param jobs: The number of processes to use.  None means one per CPU.
+    :return: an iterator of (entry, blueprint, error, warnings) for each entry, in the same
+             order as the entries
+    """
+    if jobs == 1 or len(entries) < 2:
+        for entry in entries:
+            yield render_entry(templates_path, cache_dir, entry)
+        return
+
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = [executor.submit(render_entry, templates_path, cache_dir, entry)
+                   for entry in entries]
+
+        for future in futures:
+            yield future.result()
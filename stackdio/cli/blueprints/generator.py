@@ -1,32 +1,105 @@
 from __future__ import print_function, unicode_literals
 
+import copy
 import json
 import os
 import sys
+import threading
 
 import click
 import yaml
-from jinja2 import Environment, FileSystemLoader, StrictUndefined, meta
+from jinja2 import (Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined,
+                    meta)
 from jinja2.exceptions import TemplateNotFound, TemplateSyntaxError, UndefinedError
 from jinja2.filters import do_replace, evalcontextfilter
 from jinja2.nodes import Assign, Block, Const, If, Not
 
+try:
+    # libyaml's loader is much faster than the pure python one
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+# Where compiled templates are cached by default.  This is next to the CLI's client.cfg, but
+# spelled out here so the generator doesn't have to import the client.
+TEMPLATE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.stackdio', 'template-cache')
+
+
+# Parsed yaml files, keyed by path
+_yaml_files = {}
+_yaml_files_lock = threading.Lock()
+
 
 class BlueprintException(Exception):
     pass
 
 
+def load_yaml(stream):
+    """
+    Safely load a yaml document from a string or file
+    """
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def load_yaml_file(path):
+    """
+    Load a yaml file.  A file is only parsed again once its mtime or size changes, and every
+    caller gets its own copy of the data, so changing it doesn't affect anyone else.
+
+    :param path: The path of the file
+    :return: the parsed data
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime, stat.st_size)
+
+    with _yaml_files_lock:
+        cached = _yaml_files.get(path)
+
+    if cached is None or cached[0] != version:
+        with open(path, 'r') as f:
+            cached = version, load_yaml(f)
+
+        with _yaml_files_lock:
+            _yaml_files[path] = cached
+
+    return copy.deepcopy(cached[1])
+
+
+def get_bytecode_cache(cache_dir):
+    """
+    Get a cache for compiled templates in cache_dir.  Jinja2 checks each cached entry against
+    the checksum of the template source, so edited templates are recompiled.
+
+    :param cache_dir: The directory to keep the compiled templates in
+    :return: the cache, or None if the directory can't be created
+    :rtype: FileSystemBytecodeCache
+    """
+    cache_dir = os.path.expanduser(cache_dir)
+
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            return None
+
+    return FileSystemBytecodeCache(cache_dir)
+
+
 class BlueprintGenerator(object):
     """
     Blueprint generator class.  Uses Jinja2 to generate blueprints from JSON
     templates, with inheritance.
     """
 
-    def __init__(self, templates_path, output_stream=sys.stdout):
+    def __init__(self, templates_path, output_stream=sys.stdout, cache_dir=None):
         """
         Need to create the jinja2 environment
 
         :param templates_path: A list of directories in which to look for templates
+        :param cache_dir: A directory to cache compiled templates in, so they aren't compiled
+                          again on every run.  None turns the cache off.
         :return:
         """
         self.settings = {
@@ -37,11 +110,17 @@ class BlueprintGenerator(object):
 
         self.out_stream = output_stream
 
+        # The results of validate(), keyed by template name.  Each entry is kept alongside the
+        # jinja2 uptodate checks of the template and all its super templates, so an edited
+        # template anywhere in the chain is parsed again.
+        self._validated = {}
+
         templates_path.append(self.settings['template_dir'])
 
         self.env = Environment(
             loader=FileSystemLoader(templates_path),
-            undefined=StrictUndefined)
+            undefined=StrictUndefined,
+            bytecode_cache=get_bytecode_cache(cache_dir) if cache_dir else None)
 
         # Add a filter for json - then we can put lists, etc in our templates
         self.env.filters['json'] = lambda value: json.dumps(value)  # pylint: disable=unnecessary-lambda
@@ -86,7 +165,7 @@ class BlueprintGenerator(object):
         # This should work nicely - if yaml can't parse it properly, then it should be fine to just
         # return the raw string
         try:
-            yaml_parsed = yaml.safe_load(raw)
+            yaml_parsed = load_yaml(raw)
 
             # safe_load returns None if the input is the empty string, so we want to put it back
             # to the empty string
@@ -151,15 +230,27 @@ class BlueprintGenerator(object):
     def validate(self, template_file):
         """
         Find all available and overridden vars in a template.  Recursively checks all
-        super templates.
+        super templates.  The results are remembered until one of the templates changes on
+        disk, so shared base templates are only parsed once.
 
         :param template_file: The name of the template file
         :return: the set and unset variables
         :rtype: tuple
         """
+        unset_vars, set_vars, _ = self._validate(template_file)
+
+        # Hand out copies, callers are free to modify them
+        return set(unset_vars), dict(set_vars)
+
+    def _validate(self, template_file):
+        cached = self._validated.get(template_file)
+
+        if cached is not None and all(uptodate() for uptodate in cached[2]):
+            return cached
+
         # Get all the info for the CURRENT template
         # Get the source of the template
-        template_source = self.env.loader.get_source(self.env, template_file)[0]
+        template_source, _, uptodate = self.env.loader.get_source(self.env, template_file)
         # parse it into an abstract syntax tree
         ast = self.env.parse(template_source)
 
@@ -169,20 +260,27 @@ class BlueprintGenerator(object):
         # the SET variables in the current template
         set_vars = self.find_set_vars(ast)
 
+        uptodates = [uptodate] if uptodate is not None else []
+
         # validate the super templates
         super_templates = meta.find_referenced_templates(ast)
 
         for template in super_templates:
             # Get all the information about the super template recursively
-            super_unset, super_set = self.validate(template)
+            super_unset, super_set, super_uptodates = self._validate(template)
 
             # We do it this way so values in derived templates override those in base templates
+            super_set = dict(super_set)
             super_set.update(set_vars)
             set_vars = super_set
 
             unset_vars = unset_vars.union(super_unset)
 
-        return unset_vars, set_vars
+            uptodates.extend(super_uptodates)
+
+        self._validated[template_file] = unset_vars, set_vars, uptodates
+
+        return self._validated[template_file]
 
     def generate(self, template_file, var_files=(), variables=None,
                  prompt=False, debug=False, suppress_warnings=False):
@@ -194,7 +292,8 @@ class BlueprintGenerator(object):
 
         :param template_file: The relative location of the template.  It must be in one of the
         directories you specified when creating the Generator object.
-        :param var_files: The location of the variable file(s) (relative or absolute)
+        :param var_files: The location of the variable file(s) (relative or absolute), or
+        open files
         :param variables: A dict of variables to put in the template.
         :param prompt: Option to prompt for missing variables
         :param debug: Print the output of the template before trying to parse it as JSON
@@ -207,7 +306,14 @@ class BlueprintGenerator(object):
 
             context = {}
             for var_file in var_files:
-                yaml_parsed = yaml.safe_load(var_file)
+                if not hasattr(var_file, 'read'):
+                    yaml_parsed = load_yaml_file(var_file)
+                elif os.path.isfile(getattr(var_file, 'name', '')):
+                    # An open file on disk can go through the cache too
+                    yaml_parsed = load_yaml_file(var_file.name)
+                else:
+                    yaml_parsed = load_yaml(var_file)
+
                 if yaml_parsed:
                     context.update(yaml_parsed)
 
@@ -244,7 +350,7 @@ class BlueprintGenerator(object):
             # block).  They were set to None in the set_vars dict inside the validate method
             optional_vars = set()
 
-            for var, val in set_vars.items():
+            for var, val in list(set_vars.items()):
                 if val is None:
                     optional_vars.add(var)
                     # Need to get rid of this now so it doesn't cause problems later
@@ -289,7 +395,7 @@ class BlueprintGenerator(object):
                 # Return a dict object rather than a string
                 return json.loads(rendered_template)
             elif template_extension in ('yaml', 'yml'):
-                return yaml.safe_load(rendered_template)
+                return load_yaml(rendered_template)
             else:
                 self.error_exit('Template extension {} is not valid.'.format(template_extension))
 
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import errno
+import json
+import os
+import time
+from contextlib import contextmanager
+from functools import update_wrapper
+
+import click
+from requests.exceptions import HTTPError
+
+from stackdio.client import StackdioClient
+from stackdio.client.compat import replace_file, urlparse
+
+ID_CACHE_FILE = 'ids.json'
+
+META_KEY = 'stackdio.id_cache'
+
+# How long to wait for another process to finish saving, and when to assume it died
+LOCK_TIMEOUT = 2.0
+STALE_LOCK_AGE = 10.0
+
+# Requests that can be sent again without changing anything
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# How to check a cached id against the server: the client method that gets the object, and
+# the field its title is in
+ID_CHECKS = {
+    'stacks': ('get_stack', 'title'),
+    'blueprints': ('get_blueprint', 'title'),
+    'formulas': ('get_formula', 'uri'),
+}
+
+
+class IdCache(object):
+    """
+    A persistent title -> id index, so commands that take a title don't have to list every
+    object on the server first.  Entries are kept per server & user.  They aren't checked
+    up front; a cached id that has gone away shows up as an error on the first request made
+    with it, and commands decorated with ``retry_stale_ids`` then look the title up again.
+    Destructive commands look the title up every time instead.
+    """
+
+    def __init__(self, path, scope, enabled=True):
+        """
+        :param path: The file the index is kept in
+        :param scope: What the ids belong to, e.g. the server url & username
+        :param enabled: If False, nothing is read or saved
+        """
+        super(IdCache, self).__init__()
+        self.path = path
+        self.scope = scope
+        self.enabled = enabled
+
+        # The ids handed out from the cache during this command, keyed by (kind, title)
+        self.used = {}
+
+        self._data = None
+
+        # Changes not written out yet, as (kind, title, id) where a title of None means the
+        # whole kind and an id of None means a delete
+        self._changes = []
+
+    @classmethod
+    def for_client(cls, client, enabled=True):
+        return cls(os.path.join(client.config.config_dir, ID_CACHE_FILE),
+                   '{0} {1}'.format(client.url, client.username),
+                   enabled)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+        return data if isinstance(data, dict) else {}
+
+    def _load(self):
+        if self._data is None:
+            self._data = self._read() if self.enabled else {}
+        return self._data.setdefault(self.scope, {})
+
+    @staticmethod
+    def _apply(ids, change):
+        kind, title, obj_id = change
+
+        if title is None:
+            ids.pop(kind, None)
+        elif obj_id is None:
+            ids.get(kind, {}).pop(title, None)
+        else:
+            ids.setdefault(kind, {})[title] = obj_id
+
+    def _change(self, kind, title, obj_id=None):
+        change = (kind, title, obj_id)
+        self._apply(self._load(), change)
+        self._changes.append(change)
+        self._save()
+
+    def _save(self):
+        changes, self._changes = self._changes, []
+
+        if not self.enabled or not os.path.isdir(os.path.dirname(self.path)):
+            return
+
+        with self._lock():
+            # Other CLI processes may have saved since we loaded, so apply our changes on top
+            # of what's there now instead of writing out our own (old) copy
+            data = self._read()
+            ids = data.setdefault(self.scope, {})
+            for change in changes:
+                self._apply(ids, change)
+
+            tmp_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f)
+                replace_file(tmp_path, self.path)
+            except (IOError, OSError):
+                return
+
+        self._data = data
+
+    @contextmanager
+    def _lock(self):
+        """
+        Keep other processes from saving at the same time.  If the lock can't be had the
+        save goes ahead anyway; at worst an entry is lost and gets looked up again.
+        """
+        lock_path = self.path + '.lock'
+        deadline = time.time() + LOCK_TIMEOUT
+        locked = False
+
+        while not locked and time.time() < deadline:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                locked = True
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    break
+
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_AGE:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+
+                time.sleep(0.01)
+
+        try:
+            yield
+        finally:
+            if locked:
+                try:
+                    os.remove(lock_path)
+                except OSError:
+                    pass
+
+    def get(self, kind, title):
+        obj_id = self._load().get(kind, {}).get(title)
+        if obj_id is not None:
+            self.used[(kind, title)] = obj_id
+        return obj_id
+
+    def set(self, kind, title, obj_id):
+        if self._load().get(kind, {}).get(title) != obj_id:
+            self._change(kind, title, obj_id)
+
+    def forget(self, kind, title=None):
+        """
+        Drop one title, or every title of a kind if title is None
+        """
+        self._change(kind, title)
+
+def get_id_cache(client):
+    """
+    The IdCache for the current command.  Outside of a command a disabled one is returned.
+    """
+    ctx = click.get_current_context(silent=True)
+
+    if ctx is None:
+        return IdCache.for_client(client, enabled=False)
+
+    if META_KEY not in ctx.meta:
+        ctx.meta[META_KEY] = IdCache.for_client(client)
+
+    return ctx.meta[META_KEY]
+
+
+def resolve_id(client, kind, title, lookup, fresh=False):
+    """
+    Turn a title into an id, from the cache if possible
+
+    :param kind: What the title is of, e.g. ``stacks``
+    :param title: The title to resolve
+    :param lookup: A function (client, title) that asks the server for the id
+    :param fresh: Always ask the server.  Destructive commands use this, so a title that has
+                  moved to another object can't delete (or terminate) the wrong one.
+    """
+    cache = get_id_cache(client)
+
+    obj_id = None if fresh else cache.get(kind, title)
+
+    if obj_id is None:
+        obj_id = lookup(client, title)
+        cache.set(kind, title, obj_id)
+
+    return obj_id
+
+
+def _uses_id(url, kind, obj_id):
+    return '/{0}/{1}/'.format(kind, obj_id) in urlparse(url).path + '/'
+
+
+def suspect_ids(response, sent, used):
+    """
+    The cached ids an error response may be down to.  Only the first request made with an id
+    can blame it (anything after that got past it), and nothing is suspected once the
+    command has sent a request that changes something, since running it again could do
+    that twice.
+
+    :param response: The error response
+    :param sent: The (method, url) of every request the command sent, in order
+    :param used: The ids handed out from the cache, keyed by (kind, title)
+    :return: the (kind, title) keys of the suspects
+    :rtype: list
+    """
+    path = urlparse(response.url).path
+
+    failed = None
+    for index in range(len(sent) - 1, -1, -1):
+        if urlparse(sent[index][1]).path == path:
+            failed = index
+            break
+
+    if failed is None:
+        return []
+
+    method = sent[failed][0]
+    earlier = sent[:failed]
+
+    if any(m not in IDEMPOTENT_METHODS for m, _ in earlier):
+        return []
+
+    if response.status_code == 404:
+        # The id has to be in the url, e.g. stacks/<id>/hosts/
+        suspects = [key for key, obj_id in used.items()
+                    if _uses_id(response.url, key[0], obj_id)]
+    elif response.status_code == 400 and method not in IDEMPOTENT_METHODS:
+        # A field holding the id was rejected, e.g. the blueprint of a stack being launched
+        try:
+            body = response.json()
+        except ValueError:
+            return []
+
+        if not isinstance(body, dict):
+            return []
+
+        suspects = [key for key in used if key[0].rstrip('s') in body]
+    else:
+        return []
+
+    return [key for key in suspects
+            if not any(_uses_id(url, key[0], used[key]) for _, url in earlier)]
+
+
+def is_stale(client, kind, title, obj_id):
+    """
+    Ask the server whether a cached id is gone, or now belongs to something with another
+    title
+    """
+    if kind not in ID_CHECKS:
+        return True
+
+    getter, field = ID_CHECKS[kind]
+
+    try:
+        obj = getattr(client, getter)(obj_id, none_on_404=True)
+    except HTTPError:
+        return False
+
+    return obj is None or obj.get(field) != title
+
+
+def _forget_stale_ids(client, cache, error, sent):
+    """
+    :return: whether any of the ids behind the error were stale (and are now forgotten)
+    """
+    response = getattr(error, 'response', None)
+
+    if response is None:
+        return False
+
+    stale = [key for key in suspect_ids(response, sent, cache.used)
+             if is_stale(client, key[0], key[1], cache.used[key])]
+
+    for kind, title in stale:
+        cache.forget(kind, title)
+
+    return bool(stale)
+
+
+def retry_stale_ids(f):
+    """
+    Run a command again with freshly looked up ids if the server rejects one that was
+    resolved from the cache
+    """
+    @click.pass_context
+    def new_func(ctx, *args, **kwargs):
+        cache = ctx.meta.get(META_KEY)
+        client = ctx.find_object(StackdioClient)
+
+        if cache is None or client is None:
+            return ctx.invoke(f, *args, **kwargs)
+
+        cache.used = {}
+        sent = []
+
+        def record(method, endpoint, url, kwargs):
+            sent.append((method, url))
+
+        client.request_hooks.append(record)
+
+        try:
+            try:
+                return ctx.invoke(f, *args, **kwargs)
+            finally:
+                client.request_hooks.remove(record)
+        except HTTPError as e:
+            if not _forget_stale_ids(client, cache, e, sent):
+                raise
+
+        return ctx.invoke(f, *args, **kwargs)
+
+    return update_wrapper(new_func, f)
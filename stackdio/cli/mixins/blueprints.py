@@ -3,9 +3,8 @@ import json
 import os
 
 import click
-import yaml
 
-from stackdio.cli.blueprints.generator import BlueprintGenerator, BlueprintException
+from stackdio.cli.id_cache import get_id_cache, resolve_id, retry_stale_ids
 from stackdio.cli.utils import print_summary, pass_client
 
 
@@ -28,7 +27,15 @@ def list_blueprints(client):
     List all blueprints
     """
     click.echo('Getting blueprints ... ')
-    print_summary('Blueprint', client.list_blueprints())
+    print_summary('Blueprint', client.list_blueprints(stream=True))
+
+
+def _load_mappings(blueprint_dir):
+    # The generator pulls in jinja2 & yaml, which are slow to import, so only pull it in for
+    # the commands that need it
+    from stackdio.cli.blueprints.generator import load_yaml_file
+
+    return load_yaml_file(os.path.join(os.path.expanduser(blueprint_dir), 'mappings.yaml'))
 
 
 def _recurse_dir(dirname, extensions, prefix=''):
@@ -58,7 +65,7 @@ def list_templates(client):
         raise click.UsageError('Missing \'blueprint_dir\' in config.  Please run `configure`.')
 
     click.echo('Template mappings:')
-    mapping = yaml.safe_load(open(os.path.join(blueprint_dir, 'mappings.yaml'), 'r'))
+    mapping = _load_mappings(blueprint_dir)
     if mapping:
         for blueprint in mapping:
             click.echo('    {0}'.format(blueprint))
@@ -74,20 +81,36 @@ def list_templates(client):
     _recurse_dir(os.path.join(blueprint_dir, 'var_files'), ['yaml', 'yml'])
 
 
-def _create_single_blueprint(config, template_file, var_files, no_prompt,
-                             extra_vars=None, suppress_warnings=False):
-    blueprint_dir = os.path.expanduser(config['blueprint_dir'])
+def _get_template_cache_dir(config):
+    """
+    Where compiled templates are cached.  It's next to the config file unless
+    ``template_cache_dir`` is set, and ``template_cache = False`` turns it off.
+    """
+    if not config.get('template_cache', True):
+        return None
+
+    cache_dir = config.get('template_cache_dir') or os.path.join(config.config_dir,
+                                                                 'template-cache')
+    return os.path.expanduser(cache_dir)
+
+
+def _get_generator(blueprint_dir, cache_dir=None):
+    # The generator pulls in jinja2 & yaml, which are slow to import
+    from stackdio.cli.blueprints.generator import BlueprintGenerator
 
-    gen = BlueprintGenerator([os.path.join(blueprint_dir, 'templates')])
+    return BlueprintGenerator([os.path.join(blueprint_dir, 'templates')], cache_dir=cache_dir)
 
+
+def _render_blueprint(gen, blueprint_dir, template_file, var_files, no_prompt,
+                      extra_vars=None, suppress_warnings=False):
     if not os.path.exists(os.path.join(blueprint_dir, 'templates', template_file)):
-        click.secho('You gave an invalid template', fg='red')
+        click.secho('You gave an invalid template', file=gen.out_stream, fg='red')
         return
 
     if template_file.startswith('_'):
         click.secho('WARNING: Templates beginning with \'_\' are generally not meant to '
                     'be used directly.  Please be sure this is really what you want.\n',
-                    fg='magenta')
+                    file=gen.out_stream, fg='magenta')
 
     final_var_files = []
 
@@ -95,10 +118,10 @@ def _create_single_blueprint(config, template_file, var_files, no_prompt,
     for var_file in var_files:
         var_file = os.path.join(blueprint_dir, 'var_files', var_file)
         if os.path.exists(var_file):
-            final_var_files.append(open(var_file, 'r'))
+            final_var_files.append(var_file)
         else:
             click.secho('WARNING: Variable file {0} was not found.  Ignoring.'.format(var_file),
-                        fg='magenta')
+                        file=gen.out_stream, fg='magenta')
 
     # Generate the JSON for the blueprint
     return gen.generate(template_file,
@@ -108,6 +131,16 @@ def _create_single_blueprint(config, template_file, var_files, no_prompt,
                         suppress_warnings=suppress_warnings)
 
 
+def _create_single_blueprint(config, template_file, var_files, no_prompt,
+                             extra_vars=None, suppress_warnings=False):
+    blueprint_dir = os.path.expanduser(config['blueprint_dir'])
+
+    gen = _get_generator(blueprint_dir, _get_template_cache_dir(config))
+
+    return _render_blueprint(gen, blueprint_dir, template_file, var_files, no_prompt,
+                             extra_vars, suppress_warnings)
+
+
 @blueprints.command(name='create')
 @pass_client
 @click.option('-m', '--mapping',
@@ -135,7 +168,7 @@ def create_blueprint(client, mapping, template, var_file, no_prompt):
         raise click.UsageError('Missing \'blueprint_dir\' in config.  Please run `configure`.')
 
     if mapping:
-        mappings = yaml.safe_load(open(os.path.join(blueprint_dir, 'mappings.yaml'), 'r'))
+        mappings = _load_mappings(blueprint_dir)
         if not mappings or mapping not in mappings:
             click.secho('You gave an invalid mapping.', fg='red')
             return
@@ -156,13 +189,20 @@ def create_blueprint(client, mapping, template, var_file, no_prompt):
     click.echo('Creating blueprint')
 
     r = client.create_blueprint(bp_json, raise_for_status=False)
+    if 'id' in r and 'title' in r:
+        get_id_cache(client).set('blueprints', r['title'], r['id'])
     click.echo(json.dumps(r, indent=2))
 
 
 @blueprints.command(name='create-all')
 @pass_client
 @click.confirmation_option('-y', '--yes', prompt='Really create all blueprints?')
-def create_all_blueprints(client):
+@click.option('-j', '--jobs', type=click.INT, default=None,
+              help='The number of processes to render templates with.  Defaults to the '
+                   'number of CPUs.')
+@click.option('-u', '--upload-concurrency', type=click.INT, default=10,
+              help='The max number of blueprints to upload at once')
+def create_all_blueprints(client, jobs, upload_concurrency):
     """
     Create all the blueprints in the map file
     """
@@ -170,28 +210,97 @@ def create_all_blueprints(client):
         blueprint_dir = os.path.expanduser(client.config['blueprint_dir'])
     except KeyError:
         raise click.UsageError('Missing \'blueprint_dir\' in config.  Please run `configure`.')
-    mapping = yaml.safe_load(open(os.path.join(blueprint_dir, 'mappings.yaml'), 'r'))
+
+    # These are slow to import (multiprocessing, jinja2 & yaml), so only pull them in here
+    # rather than on every command
+    from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor,
+                                    wait)
+
+    from stackdio.cli.blueprints.batch import load_mappings, render_entry
+
+    templates_path, entries = load_mappings(os.path.join(blueprint_dir, 'mappings.yaml'))
 
     blueprints = client.list_blueprints()
 
     blueprint_titles = [blueprint['title'] for blueprint in blueprints]
 
-    for name, vals in mapping.items():
-        if name in blueprint_titles:
-            click.secho('Skipping creation of {0}, it already exists.'.format(name), fg='yellow')
-            continue
+    to_create = []
 
-        try:
-            bp_json = _create_single_blueprint(client.config, vals['template'],
-                                               vals['var_files'], False, {'title': name},
-                                               suppress_warnings=True)
-            client.create_blueprint(bp_json)
-            click.secho('Created blueprint {0}'.format(name), fg='green')
-        except BlueprintException:
-            click.secho('Blueprint {0} NOT created\n'.format(name), fg='magenta')
+    for entry in entries:
+        if entry['name'] in blueprint_titles:
+            click.secho('Skipping creation of {0}, it already exists.'.format(entry['name']),
+                        fg='yellow')
+        else:
+            to_create.append(entry)
 
+    if not to_create:
+        return
 
-def get_blueprint_id(client, blueprint_title):
+    cache_dir = _get_template_cache_dir(client.config)
+    id_cache = get_id_cache(client)
+    failures = {}
+    warnings = {}
+
+    # Templates are rendered on a process pool, and each blueprint is uploaded on a thread
+    # pool as soon as it's rendered
+    with ProcessPoolExecutor(jobs) as renderers, \
+            ThreadPoolExecutor(upload_concurrency) as uploaders, \
+            click.progressbar(length=len(to_create), label='Creating blueprints') as bar:
+        renders = dict((renderers.submit(render_entry, templates_path, cache_dir, entry),
+                        entry['name'])
+                       for entry in to_create)
+        uploads = {}
+
+        pending = set(renders)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future in renders:
+                    try:
+                        entry, bp_json, error, entry_warnings = future.result()
+                        name = entry['name']
+                    except Exception as e:  # pylint: disable=broad-except
+                        name, bp_json, error, entry_warnings = renders[future], None, str(e), []
+
+                    if entry_warnings:
+                        warnings[name] = entry_warnings
+
+                    if error is None:
+                        upload = uploaders.submit(client.create_blueprint, bp_json)
+                        uploads[upload] = name
+                        pending.add(upload)
+                        continue
+
+                    failures[name] = error
+                else:
+                    name = uploads[future]
+
+                    try:
+                        id_cache.set('blueprints', name, future.result()['id'])
+                    except Exception as e:  # pylint: disable=broad-except
+                        failures[name] = str(e)
+
+                bar.update(1)
+
+    # Shown once the progress bar is done, so they don't get mixed into it
+    for name, entry_warnings in sorted(warnings.items()):
+        for warning in entry_warnings:
+            click.secho('WARNING: {0}: {1}'.format(name, warning), fg='magenta')
+
+    created = len(to_create) - len(failures)
+    click.secho('Created {0} blueprint(s)'.format(created), fg='green')
+
+    if failures:
+        click.secho('{0} blueprint(s) NOT created:'.format(len(failures)), fg='magenta')
+        for name, error in sorted(failures.items()):
+            click.secho('  {0}'.format(name), fg='magenta')
+            for line in error.splitlines():
+                click.echo('    {0}'.format(line))
+
+
+def _lookup_blueprint_id(client, blueprint_title):
     found_blueprints = client.list_blueprints(title=blueprint_title)
 
     if len(found_blueprints) == 0:
@@ -202,6 +311,10 @@ def get_blueprint_id(client, blueprint_title):
         return found_blueprints[0]['id']
 
 
+def get_blueprint_id(client, blueprint_title, fresh=False):
+    return resolve_id(client, 'blueprints', blueprint_title, _lookup_blueprint_id, fresh)
+
+
 @blueprints.command(name='delete')
 @pass_client
 @click.argument('title')
@@ -209,12 +322,13 @@ def delete_blueprint(client, title):
     """
     Delete a blueprint
     """
-    blueprint_id = get_blueprint_id(client, title)
+    blueprint_id = get_blueprint_id(client, title, fresh=True)
 
     click.confirm('Really delete blueprint {0}?'.format(title), abort=True)
 
     click.echo('Deleting {0}'.format(title))
     client.delete_blueprint(blueprint_id)
+    get_id_cache(client).forget('blueprints', title)
 
 
 @blueprints.command(name='delete-all')
@@ -229,8 +343,11 @@ def delete_all_blueprints(client):
         client.delete_blueprint(blueprint['id'])
         click.secho('Deleted blueprint {0}'.format(blueprint['title']), fg='magenta')
 
+    get_id_cache(client).forget('blueprints')
+
 
 @blueprints.command(name='create-label')
+@retry_stale_ids
 @pass_client
 @click.argument('title')
 @click.argument('key')
@@ -2,6 +2,7 @@ from __future__ import print_function
 
 import click
 
+from stackdio.cli.id_cache import get_id_cache, resolve_id
 from stackdio.cli.utils import pass_client, print_summary
 
 
@@ -20,7 +21,7 @@ def list_formulas(client):
     List all formulas
     """
     click.echo('Getting formulas ... ')
-    print_summary('Formula', client.list_formulas())
+    print_summary('Formula', client.list_formulas(stream=True))
 
 
 @formulas.command(name='import')
@@ -38,11 +39,12 @@ def import_formula(client, uri, username, password):
 
     click.echo('Importing formula from {0}'.format(uri))
     formula = client.import_formula(uri, git_username=username, git_password=password)
+    get_id_cache(client).set('formulas', uri, formula['id'])
 
     click.echo('Detail: {0}'.format(formula['status_detail']))
 
 
-def get_formula_id(client, formula_uri):
+def _lookup_formula_id(client, formula_uri):
     found_formulas = client.list_formulas(uri=formula_uri)
 
     if len(found_formulas) == 0:
@@ -51,6 +53,10 @@ def get_formula_id(client, formula_uri):
         return found_formulas[0]['id']
 
 
+def get_formula_id(client, formula_uri, fresh=False):
+    return resolve_id(client, 'formulas', formula_uri, _lookup_formula_id, fresh)
+
+
 @formulas.command(name='delete')
 @pass_client
 @click.argument('uri')
@@ -58,8 +64,9 @@ def delete_formula(client, uri):
     """
     Delete a formula
     """
-    formula_id = get_formula_id(client, uri)
+    formula_id = get_formula_id(client, uri, fresh=True)
 
     click.confirm('Really delete formula {0}?'.format(uri), abort=True)
 
     client.delete_formula(formula_id)
+    get_id_cache(client).forget('formulas', uri)
@@ -2,6 +2,7 @@ from __future__ import print_function
 
 import click
 
+from stackdio.cli.id_cache import get_id_cache, resolve_id, retry_stale_ids
 from stackdio.cli.mixins.blueprints import get_blueprint_id
 from stackdio.cli.utils import pass_client, print_summary, poll_and_wait
 from stackdio.client.exceptions import StackException
@@ -25,10 +26,11 @@ def list_stacks(client):
     List all stacks
     """
     click.echo('Getting stacks ... ')
-    print_summary('Stack', client.list_stacks())
+    print_summary('Stack', client.list_stacks(stream=True))
 
 
 @stacks.command(name='launch')
+@retry_stale_ids
 @pass_client
 @click.argument('blueprint_title')
 @click.argument('stack_title')
@@ -48,10 +50,11 @@ def launch_stack(client, blueprint_title, stack_title):
         'namespace': stack_title,
     }
     results = client.create_stack(stack_data)
+    get_id_cache(client).set('stacks', stack_title, results['id'])
     click.echo('Stack launch results:\n{0}'.format(results))
 
 
-def get_stack_id(client, stack_title):
+def _lookup_stack_id(client, stack_title):
     found_stacks = client.list_stacks(title=stack_title)
 
     if len(found_stacks) == 0:
@@ -62,7 +65,12 @@ def get_stack_id(client, stack_title):
         return found_stacks[0]['id']
 
 
+def get_stack_id(client, stack_title, fresh=False):
+    return resolve_id(client, 'stacks', stack_title, _lookup_stack_id, fresh)
+
+
 @stacks.command(name='history')
+@retry_stale_ids
 @pass_client
 @click.argument('stack_title')
 @click.option('-l', '--length', type=click.INT, default=20, help='The number of entries to show')
@@ -77,6 +85,7 @@ def stack_history(client, stack_title, length):
 
 
 @stacks.command(name='hostnames')
+@retry_stale_ids
 @pass_client
 @click.argument('stack_title')
 def stack_hostnames(client, stack_title):
@@ -84,7 +93,7 @@ def stack_hostnames(client, stack_title):
     Print hostnames for a stack
     """
     stack_id = get_stack_id(client, stack_title)
-    hosts = client.get_stack_hosts(stack_id)
+    hosts = client.get_stack_hosts(stack_id, stream=True)
 
     click.echo('Hostnames:')
     for host in hosts:
@@ -98,11 +107,12 @@ def delete_stack(client, stack_title):
     """
     Delete a stack.  PERMANENT AND DESTRUCTIVE!!!
     """
-    stack_id = get_stack_id(client, stack_title)
+    stack_id = get_stack_id(client, stack_title, fresh=True)
 
     click.confirm('Really delete stack {0}?'.format(stack_title), abort=True)
 
     results = client.delete_stack(stack_id)
+    get_id_cache(client).forget('stacks', stack_title)
     click.echo('Delete stack results: \n{0}'.format(results))
     click.secho('Run "stacks history {0}" to monitor status of the deletion'.format(stack_title),
                 fg='green')
@@ -116,7 +126,7 @@ def perform_action(client, stack_title, action):
     """
     Perform an action on a stack
     """
-    stack_id = get_stack_id(client, stack_title)
+    stack_id = get_stack_id(client, stack_title, fresh=True)
 
     # Prompt for confirmation if need be
     if action in REQUIRE_ACTION_CONFIRMATION:
@@ -136,6 +146,7 @@ def print_command_output(json_blob):
 
 
 @stacks.command(name='run')
+@retry_stale_ids
 @pass_client
 @click.pass_context
 @click.argument('stack_title')
@@ -211,6 +222,7 @@ def print_logs(client, stack_id):
 
 
 @stacks.command(name='list-logs')
+@retry_stale_ids
 @pass_client
 @click.argument('stack_title')
 def list_stack_logs(client, stack_title):
@@ -223,6 +235,7 @@ def list_stack_logs(client, stack_title):
 
 
 @stacks.command(name='logs')
+@retry_stale_ids
 @pass_client
 @click.argument('stack_title')
 @click.argument('log_type')
@@ -284,6 +297,7 @@ def print_access_rules(components):
 
 
 @stack_access_rules.command(name='list')
+@retry_stale_ids
 @pass_client
 @click.argument('stack_title')
 def list_access_rules(client, stack_title):
@@ -15,11 +15,13 @@
 # limitations under the License.
 #
 
+import importlib
 import sys
 import time
 from functools import update_wrapper
 
 import click
+import click_shell
 
 from stackdio.client import StackdioClient
 
@@ -32,6 +34,28 @@ class TimeoutException(Exception):
 pass_client = click.make_pass_decorator(StackdioClient)
 
 
+class LazyShell(click_shell.Shell):
+    """
+    A shell whose subcommands live in other modules, which are only imported when the
+    subcommand is actually used.  ``lazy_commands`` maps each command name to
+    ``'module.path:attribute'``.
+    """
+
+    def __init__(self, lazy_commands=None, **attrs):
+        super(LazyShell, self).__init__(**attrs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(super(LazyShell, self).list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            module_name, attr = self.lazy_commands[cmd_name].split(':')
+            command = getattr(importlib.import_module(module_name), attr)
+            self.add_command(command, cmd_name)
+        return super(LazyShell, self).get_command(ctx, cmd_name)
+
+
 def print_summary(title, components):
     num_components = len(components)
 
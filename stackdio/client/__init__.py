@@ -17,12 +17,19 @@
 
 from __future__ import unicode_literals
 
+import json
 import logging
+import os
+import re
+import threading
+import time
 
-from pkg_resources import parse_version
 from .account import AccountMixin
 from .blueprint import BlueprintMixin
+from .cache import DiskCache, ResponseCache
+from .compat import replace_file
 from .config import StackdioConfig
+from .credentials import ChainCredentials, ExplicitCredentials
 from .exceptions import (
     BlueprintException,
     StackException,
@@ -36,44 +43,120 @@ from .region import RegionMixin
 from .settings import SettingsMixin
 from .stack import StackMixin
 from .snapshot import SnapshotMixin
+from .transport import TRANSPORTS, Transport
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+VERSION_CACHE_FILE = 'server-versions.json'
+
+TOKEN_CACHE_FILE = 'tokens.json'
+
+
+def parse_version(raw_version):
+    """
+    Pull the major & minor version out of a server version string
+
+    :return: (major, minor), or None if the string doesn't look like a version
+    :rtype: tuple
+    """
+    match = re.match(r'^\s*v?(\d+)\.(\d+)', raw_version or '')
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
 
 class StackdioClient(BlueprintMixin, FormulaMixin, AccountMixin, ImageMixin,
                      RegionMixin, StackMixin, SettingsMixin, SnapshotMixin, HttpMixin):
 
-    def __init__(self, url=None, username=None, password=None, verify=None, cfg_file=None):
+    # The server versions this client works with, as (major, minor)
+    SUPPORTED_VERSIONS = ((0, 8),)
+
+    # How long a server's version is remembered on disk, in seconds.  0 turns the cache off.
+    version_cache_ttl = 24 * 60 * 60
+
+    # How long an API token (or the server not handing them out) is remembered on disk, in
+    # seconds.  0 turns the cache off.
+    token_cache_ttl = 24 * 60 * 60
+
+    def __init__(self, url=None, username=None, password=None, verify=None, cfg_file=None,
+                 pool_connections=None, pool_maxsize=None, pool_block=None, keep_alive=None,
+                 response_cache=None, disk_cache=None, retry_policy=None, transport=None,
+                 token_auth=None, credentials=None, version_check=None):
         self.config = StackdioConfig(cfg_file)
 
-        self._password = self.config.get_password()
+        # A CredentialProvider, by default the config's (environment, credentials file, then
+        # the keyring).  Passwords are looked up lazily and remembered.
+        self.credentials = credentials or self.config.credentials
 
         if url is not None:
             self.config['url'] = url
 
         if username is not None and password is not None:
             self.config['username'] = username
-            self._password = password
+            self.credentials = ChainCredentials([ExplicitCredentials(password, username),
+                                                 self.credentials])
 
         if verify is not None:
             self.config['verify'] = verify
 
+        if pool_connections is not None:
+            self.pool_connections = pool_connections
+
+        if pool_maxsize is not None:
+            self.pool_maxsize = pool_maxsize
+
+        if pool_block is not None:
+            self.pool_block = pool_block
+
+        if keep_alive is not None:
+            self.keep_alive = keep_alive
+
+        # Either a Transport instance, or the name of one of the built in transports
+        transport = transport or self.config.get('transport')
+
+        if transport and not isinstance(transport, Transport):
+            if transport not in TRANSPORTS:
+                raise ValueError('Unknown transport {0}, must be one of {1}'.format(
+                    transport, ', '.join(sorted(TRANSPORTS))))
+            self.transport_class = TRANSPORTS[transport]
+
+        if response_cache is True:
+            self.response_cache = ResponseCache()
+        elif response_cache:
+            self.response_cache = response_cache
+
+        if token_auth is not None:
+            self.token_auth = token_auth
+
+        if retry_policy is False:
+            self.retry_policy = None
+        elif retry_policy is not None:
+            self.retry_policy = retry_policy
+
+        # None means use whatever the config says, True means use it unless the config turns
+        # it off.
+        if disk_cache is None or disk_cache is True:
+            if self.config.get('cache', disk_cache is True):
+                self.disk_cache = DiskCache.from_config(self.config)
+        elif disk_cache:
+            self.disk_cache = disk_cache
+
         super(StackdioClient, self).__init__()
 
-        if self.usable():
-            try:
-                raw_version = self.get_version(raise_for_status=False)
-                self.version = parse_version(raw_version)
-            except MissingUrlException:
-                raw_version = None
-                self.version = None
+        if isinstance(transport, Transport):
+            self.transport = transport
+
+        # The server version is checked right before the first request rather than here, so
+        # building a client is free.  It can be turned off entirely.
+        if version_check is None:
+            version_check = self.config.get('version_check', True)
 
-            if self.version and (int(self.version[0]) != 0 or int(self.version[1]) != 8):
-                raise IncompatibleVersionException(
-                    'Server version {0} not supported.  Please upgrade '
-                    'stackdio-cli to {1}.{2}.0 or higher.'.format(raw_version, *self.version)
-                )
+        self._raw_version = None
+        self._version_ok = not version_check
+        self._version_checked = not version_check
+        self._checking_version = False
+        self._version_lock = threading.RLock()
 
     @property
     def url(self):
@@ -85,7 +168,7 @@ class StackdioClient(BlueprintMixin, FormulaMixin, AccountMixin, ImageMixin,
 
     @property
     def password(self):
-        return self._password or self.config.get_password()
+        return self.credentials.get_password(self.username)
 
     @property
     def verify(self):
@@ -94,6 +177,134 @@ class StackdioClient(BlueprintMixin, FormulaMixin, AccountMixin, ImageMixin,
     def usable(self):
         return self.url and self.username and self.password
 
+    @property
+    def version(self):
+        """
+        The server's (major, minor) version, or None if it's unknown or the check is off
+        """
+        self.check_version()
+        return parse_version(self._raw_version)
+
+    def _before_request(self):
+        if not self._version_ok:
+            self.check_version()
+
+    def check_version(self):
+        """
+        Make sure the server is a version this client supports.  The answer is cached on
+        disk for version_cache_ttl, and only looked up once per client.
+
+        :raises IncompatibleVersionException: if it isn't
+        """
+        if not self._version_checked:
+            with self._version_lock:
+                # The lookup itself is a request, which comes back through here
+                if self._checking_version:
+                    return
+
+                if not self._version_checked:
+                    self._checking_version = True
+                    try:
+                        self._raw_version = self._get_cached_version()
+                        if self._raw_version is None:
+                            self._raw_version = self.get_version(none_on_404=True)
+                            self._set_cached_version(self._raw_version)
+                        self._version_checked = True
+                    finally:
+                        self._checking_version = False
+
+        version = parse_version(self._raw_version)
+
+        if version is not None and version not in self.SUPPORTED_VERSIONS:
+            raise IncompatibleVersionException(
+                'Server version {0} not supported.  Please upgrade '
+                'stackdio-cli to {1}.{2}.0 or higher.'.format(self._raw_version, *version)
+            )
+
+        self._version_ok = True
+
+    def _read_cache_file(self, name):
+        try:
+            with open(os.path.join(self.config.config_dir, name)) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+        return data if isinstance(data, dict) else {}
+
+    def _update_cache_file(self, name, key, entry, private=False):
+        """
+        Set (or with an entry of None, remove) one entry of a json file in the config dir
+
+        :param private: Only let the current user read the file
+        """
+        if not os.path.isdir(self.config.config_dir):
+            return
+
+        cache = self._read_cache_file(name)
+
+        if entry is None:
+            cache.pop(key, None)
+        else:
+            cache[key] = entry
+
+        path = os.path.join(self.config.config_dir, name)
+        tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600 if private else 0o666)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cache, f)
+            replace_file(tmp_path, path)
+        except (IOError, OSError):
+            logger.debug('Unable to save {0}'.format(path))
+
+    def _get_cached_version(self):
+        if not self.version_cache_ttl:
+            return None
+
+        entry = self._read_cache_file(VERSION_CACHE_FILE).get(self.url)
+
+        if not entry or time.time() - entry.get('checked', 0) > self.version_cache_ttl:
+            return None
+
+        return entry.get('version')
+
+    def _set_cached_version(self, raw_version):
+        if not self.version_cache_ttl or raw_version is None:
+            return
+
+        self._update_cache_file(VERSION_CACHE_FILE, self.url,
+                                {'version': raw_version, 'checked': time.time()})
+
+    def _token_cache_key(self):
+        return '{0} {1}'.format(self.url, self.username)
+
+    def _load_token_state(self):
+        if not self.token_cache_ttl:
+            return None, None
+
+        entry = self._read_cache_file(TOKEN_CACHE_FILE).get(self._token_cache_key())
+
+        if not entry or time.time() - entry.get('saved', 0) > self.token_cache_ttl:
+            return None, None
+
+        return entry.get('token'), entry.get('supported')
+
+    def _save_token_state(self, token, supported):
+        if not self.token_cache_ttl:
+            return
+
+        if token is None and supported is None:
+            entry = None
+        else:
+            entry = {'token': token, 'supported': supported, 'saved': time.time()}
+
+        # The token is as good as the password, so keep it private
+        self._update_cache_file(TOKEN_CACHE_FILE, self._token_cache_key(), entry,
+                                private=True)
+
     @get('')
     def get_root(self):
         pass
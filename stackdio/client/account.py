@@ -20,7 +20,7 @@ from .http import HttpMixin, get, post, delete
 
 class AccountMixin(HttpMixin):
 
-    @get('cloud/providers/', paginate=True)
+    @get('cloud/providers/', paginate=True, cache_ttl=24 * 60 * 60)
     def list_providers(self, **kwargs):
         """List all providers"""
         pass
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+An asyncio flavor of the client, built from the same endpoint definitions as
+StackdioClient.  Requires python 3.6+ and aiohttp (``pip install stackdio[async]``).
+
+Requests go through the same pipeline as the blocking client: token auth, the retry
+policy and circuit breakers, the disk cache, metrics and request / response hooks.  Errors
+are the same too: requests' HTTPError, ConnectionError and Timeout.  The only differences
+are:
+
+* Requests are always sent on aiohttp.  The transport settings don't apply.
+* GET requests don't go through the in-memory response_cache.
+* Logging in for a token, the version check, and anything an endpoint's data function
+  calls (e.g. the formula lookups in create_blueprint) are blocking calls.
+"""
+
+import asyncio
+import logging
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+
+import aiohttp
+from requests.exceptions import ConnectionError, Timeout
+
+from . import StackdioClient
+from .compat import string_types
+from .http import HttpMixin, get_page_urls
+from .transport import Response
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class AsyncRequest(object):
+    """
+    An endpoint bound to an async client.  Calling it returns a coroutine, or an async
+    generator for paginated endpoints called with stream=True.
+    """
+
+    def __init__(self, request, obj):
+        super(AsyncRequest, self).__init__()
+        self.request = request
+        self.obj = obj
+
+        self.__name__ = getattr(request, '__name__', None)
+        self.__doc__ = request.__doc__
+
+    def __repr__(self):
+        return ('<bound coroutine HTTP {0} request for '
+                '\'/api/{1}\' on {2}>'.format(self.request.method, self.request.path,
+                                              repr(self.obj)))
+
+    def __call__(self, *args, **kwargs):
+        # The data func is plain synchronous code shared with the sync client, so any endpoint
+        # it calls itself (e.g. the formula lookups in create_blueprint) is sent synchronously
+        with self.obj.sync_calls():
+            url, data, params, options = self.request.prepare(self.obj, args, kwargs)
+
+            # The lazy version check is sent synchronously, but only the first time
+            self.obj._before_request()
+
+        if self.request.paginate and options['stream']:
+            return self._stream(url, data, params, options)
+
+        return self._call(url, data, params, options)
+
+    async def _send(self, url, data, params, options, page=False):
+        return await self.obj._async_request(self.request.method,
+                                             url,
+                                             cache_ttl=self.request.cache_ttl,
+                                             retry=self.request.retry,
+                                             endpoint=self.request.path,
+                                             page=page,
+                                             refresh=not options['cache'],
+                                             data=data,
+                                             headers=self.request.headers,
+                                             params=params)
+
+    async def _get_page(self, url, data, params, options):
+        resp = await self._send(url, data, params, options, page=True)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _get_first(self, url, data, params, options):
+        """
+        Send the initial request.  Returns None for the special cases that
+        don't have a body to process.
+        """
+        resp = await self._send(url, data, params, options, page=self.request.paginate)
+
+        # Handle special conditions
+        if options['none_on_404'] and resp.status_code == 404:
+            return None
+
+        elif resp.status_code == 204:
+            return None
+
+        elif options['raise_for_status']:
+            try:
+                resp.raise_for_status()
+            except Exception:
+                logger.error(resp.text)
+                raise
+
+        if self.request.jsonify:
+            return resp.json()
+        else:
+            return resp.text
+
+    async def _call(self, url, data, params, options):
+        response = await self._get_first(url, data, params, options)
+
+        if response is None:
+            return None
+
+        if self.request.paginate:
+            res = response['results']
+
+            next_url = response.get('next')
+
+            page_urls = None
+
+            if next_url and options['concurrency'] > 1:
+                page_urls = get_page_urls(next_url, response.get('count'), len(res))
+
+            if page_urls:
+                # Grab all the remaining pages at once, with at most `concurrency` in flight
+                semaphore = asyncio.Semaphore(options['concurrency'])
+
+                async def get_page(page_url):
+                    async with semaphore:
+                        return await self._get_page(page_url, data, params, options)
+
+                # gather() hands the pages back in order
+                for next_page in await asyncio.gather(*[get_page(u) for u in page_urls]):
+                    res.extend(next_page['results'])
+            else:
+                # Fall back to following the next links one at a time
+                while next_url:
+                    next_page = await self._get_page(next_url, data, params, options)
+                    res.extend(next_page['results'])
+                    next_url = next_page.get('next')
+
+            response = res
+
+        # now process the result
+        with self.obj.sync_calls():
+            return self.request.response_func(self.obj, response)
+
+    async def _stream(self, url, data, params, options):
+        # The response func expects the full list, so it doesn't get applied here
+        page = await self._get_first(url, data, params, options)
+
+        while page is not None:
+            # Prefetch the next page while the current one is being consumed
+            next_url = page.get('next')
+            next_page = asyncio.ensure_future(
+                self._get_page(next_url, data, params, options)
+            ) if next_url else None
+
+            try:
+                for item in page['results']:
+                    yield item
+            except GeneratorExit:
+                if next_page is not None:
+                    next_page.cancel()
+                raise
+
+            page = await next_page if next_page is not None else None
+
+
+async def send_with_policy(policy, send, method, breaker):
+    """
+    The async version of RetryPolicy.send
+
+    :param policy: The RetryPolicy to follow
+    :param send: A coroutine function that sends the request once
+    :param method: The HTTP method of the request
+    :param breaker: The circuit breaker for the host the request is going to
+    :return: the final response
+    """
+    attempt = 0
+    wait = None
+
+    while True:
+        breaker.before_request()
+
+        try:
+            response = await send()
+        except (ConnectionError, Timeout):
+            wait = policy.next_wait(method, attempt, wait, breaker)
+            if wait is None:
+                raise
+        else:
+            wait = policy.next_wait(method, attempt, wait, breaker, response)
+            if wait is None:
+                return response
+
+        attempt += 1
+        await asyncio.sleep(wait)
+
+
+class AsyncHttpMixin(HttpMixin):
+    """
+    Sends endpoint requests on an aiohttp session instead of the blocking requests session
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._sync_local = threading.local()
+        self._async_session = None
+
+        # Anything done while setting the client up (e.g. the version check) is blocking
+        with self.sync_calls():
+            super(AsyncHttpMixin, self).__init__(*args, **kwargs)
+
+    @contextmanager
+    def sync_calls(self):
+        """
+        Within this block endpoint methods on this client are the regular blocking ones
+        """
+        depth = getattr(self._sync_local, 'depth', 0)
+        self._sync_local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._sync_local.depth = depth
+
+    def _bind_request(self, request):
+        if getattr(self._sync_local, 'depth', 0):
+            return super(AsyncHttpMixin, self)._bind_request(request)
+
+        return AsyncRequest(request, self)
+
+    @property
+    def async_session(self):
+        # The session has to be created from within a coroutine, so this is only built
+        # once the first request is sent
+        if self._async_session is None or self._async_session.closed:
+            connector_kwargs = {
+                'limit': 0,
+                'limit_per_host': self.pool_maxsize if self.pool_block else 0,
+                'force_close': not self.keep_alive,
+            }
+
+            if isinstance(self.verify, string_types):
+                # A CA bundle, the same as requests takes
+                connector_kwargs['ssl'] = ssl.create_default_context(cafile=self.verify)
+            elif not self.verify:
+                connector_kwargs['ssl'] = False
+
+            connector = aiohttp.TCPConnector(**connector_kwargs)
+            self._async_session = aiohttp.ClientSession(connector=connector)
+        return self._async_session
+
+    async def _async_set_auth(self, kwargs, stale=None):
+        """
+        The same as _set_auth.  Logging in for a token blocks, so that part is done on the
+        default executor; after that the token is used without leaving the event loop.
+        """
+        if self._needs_login(stale):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, self._set_auth, kwargs, stale)
+
+        return self._set_auth(kwargs, stale)
+
+    async def _async_send(self, method, url, kwargs):
+        """
+        Send a request once on the shared aiohttp session.  The body is read before
+        returning, so the connection is already back in the pool.
+
+        :rtype: stackdio.client.transport.Response
+        """
+        auth = kwargs.get('auth')
+
+        # aiohttp only accepts strings in the query string
+        params = dict((k, str(v)) for k, v in (kwargs.get('params') or {}).items()
+                      if v is not None)
+
+        try:
+            async with self.async_session.request(method,
+                                                  url,
+                                                  data=kwargs.get('data'),
+                                                  headers=kwargs.get('headers'),
+                                                  params=params,
+                                                  auth=aiohttp.BasicAuth(*auth) if auth else None
+                                                  ) as resp:
+                content = await resp.read()
+        except asyncio.TimeoutError as e:
+            raise Timeout(str(e) or 'Timed out sending request to {0}'.format(url))
+        except aiohttp.ClientError as e:
+            raise ConnectionError(str(e))
+
+        return Response(resp.status, resp.headers, content, str(resp.url), resp.reason or '')
+
+    async def _async_request(self, method, url, cache_ttl=None, retry=None, endpoint=None,
+                             page=False, refresh=False, **kwargs):
+        """
+        The async version of HttpMixin._request, built from the same helpers
+        """
+        kwargs.setdefault('verify', self.verify)
+
+        cached = self._get_cached(method, url, cache_ttl, refresh, endpoint, kwargs)
+        if cached is not None:
+            return cached
+
+        token = None if 'auth' in kwargs else await self._async_set_auth(kwargs)
+
+        attempts = []
+
+        async def send():
+            attempt = len(attempts)
+            attempts.append(url)
+
+            self._before_send(method, endpoint, url, kwargs)
+
+            start = time.time()
+
+            try:
+                response = await self._async_send(method, url, kwargs)
+            except Exception:
+                self._after_send(method, endpoint, url, kwargs, time.time() - start, attempt,
+                                 page)
+                raise
+
+            self._after_send(method, endpoint, url, kwargs, time.time() - start, attempt, page,
+                             response)
+
+            return response
+
+        policy, breaker = self._get_policy(url, retry)
+
+        async def send_with_retries():
+            if policy:
+                return await send_with_policy(policy, send, method, breaker)
+            return await send()
+
+        response = await send_with_retries()
+
+        if token is not None and response.status_code == 401:
+            # The token expired or was revoked
+            await self._async_set_auth(kwargs, stale=token)
+            response = await send_with_retries()
+
+        self._update_cache(method, url, cache_ttl, response, kwargs)
+
+        return response
+
+    async def aclose(self):
+        """
+        Close both the async and the blocking sessions
+        """
+        self.close()
+
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+
+class AsyncStackdioClient(AsyncHttpMixin, StackdioClient):
+    """
+    The same API as StackdioClient, but every endpoint method is a coroutine.  Paginated
+    endpoints called with stream=True return an async generator instead.
+    """
+    pass
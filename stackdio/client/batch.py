@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BatchResult(object):
+    """
+    The outcome of one call in a batch.  Exactly one of result / exception is meaningful.
+    """
+
+    def __init__(self, args, kwargs, result=None, exception=None):
+        super(BatchResult, self).__init__()
+        self.args = args
+        self.kwargs = kwargs
+        self.result = result
+        self.exception = exception
+
+    @property
+    def ok(self):
+        return self.exception is None
+
+    def get(self):
+        """
+        Return the result, or raise the exception the call raised
+        """
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
+    def __repr__(self):
+        if self.ok:
+            return '<BatchResult ok: {0!r}>'.format(self.result)
+        else:
+            return '<BatchResult failed: {0!r}>'.format(self.exception)
+
+
+class Batch(object):
+    """
+    Runs endpoint calls concurrently on a thread pool.  Use it as a context manager; once
+    the block exits every call has finished and ``results`` holds one BatchResult per
+    submitted call, in the order they were submitted.
+
+        with client.batch(concurrency=20) as batch:
+            for stack_id in stack_ids:
+                batch.submit(client.get_stack, stack_id)
+
+        stacks = [r.result for r in batch.results if r.ok]
+
+    The calls all share the client's connection pool, so keep pool_maxsize at least as big
+    as the concurrency, or connections will be thrown away instead of reused.
+    """
+
+    def __init__(self, client, concurrency=10):
+        super(Batch, self).__init__()
+        self.client = client
+        self.concurrency = concurrency
+        self.results = []
+
+        self._calls = []
+        self._executor = None
+
+    def _resolve(self, method):
+        if callable(method):
+            return method
+        return getattr(self.client, method)
+
+    def _run(self, func, args, kwargs):
+        try:
+            return BatchResult(args, kwargs, result=func(*args, **kwargs))
+        except Exception as e:  # pylint: disable=broad-except
+            return BatchResult(args, kwargs, exception=e)
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Queue up a call.  method is either a method on the client, or its name.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+
+        self._calls.append(self._executor.submit(self._run, self._resolve(method), args, kwargs))
+
+    def wait(self):
+        """
+        Wait for everything submitted so far, and return all the results
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        self.results.extend(call.result() for call in self._calls)
+        self._calls = []
+
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.wait()
+
+
+def get_call_args(item):
+    """
+    Turn one item of a map() iterable into args & kwargs.  Tuples are positional args, dicts
+    are keyword args, and anything else is a single positional arg.
+    """
+    if isinstance(item, tuple):
+        return item, {}
+    elif isinstance(item, dict):
+        return (), item
+    else:
+        return (item,), {}
@@ -31,20 +31,28 @@ class BlueprintMixin(HttpMixin):
         formula_map = {}
 
         if 'formula_versions' in blueprint:
-            all_formulas = self.list_formulas()
+            catalog = self.get_formula_catalog()
 
-            used_formulas = []
+            if any(v['formula'] not in catalog for v in blueprint['formula_versions']):
+                # The formula may have been imported since the catalog was fetched
+                catalog = self.get_formula_catalog(refresh=True)
 
-            for formula_version in blueprint['formula_versions']:
-                for formula in all_formulas:
-                    if formula['uri'] == formula_version['formula']:
-                        formula['version'] = formula_version['version']
-                        used_formulas.append(formula)
-                        break
+            unknown = sorted(set(v['formula'] for v in blueprint['formula_versions']
+                                 if v['formula'] not in catalog))
 
-            for formula in used_formulas:
-                components = self.list_components_for_version(formula['id'], formula['version'])
-                for component in components:
+            if unknown:
+                raise BlueprintException('Unknown formula(s) in formula_versions: '
+                                         '{0}'.format(', '.join(unknown)))
+
+            used_formulas = [(catalog[v['formula']], v['version'])
+                             for v in blueprint['formula_versions']]
+
+            components = self.get_components_for_versions(
+                (formula['id'], version) for formula, version in used_formulas
+            )
+
+            for formula, version in used_formulas:
+                for component in components[(formula['id'], version)]:
                     formula_map[component['sls_path']] = formula['uri']
 
         # check the provided blueprint to see if we need to look up any ids
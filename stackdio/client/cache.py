@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from .compat import replace_file, urlparse
+
+
+def copy_json(value):
+    """
+    Copy a decoded json body so callers can't modify what's in the cache.  Much cheaper than
+    copy.deepcopy since we know exactly which types can show up.
+    """
+    if isinstance(value, dict):
+        return dict((k, copy_json(v)) for k, v in value.items())
+    elif isinstance(value, list):
+        return [copy_json(v) for v in value]
+    else:
+        return value
+
+
+class CacheEntry(object):
+    """
+    A cached GET response, along with the validators needed to revalidate it
+    """
+
+    def __init__(self, body, text, size, etag=None, last_modified=None):
+        super(CacheEntry, self).__init__()
+        self.body = body
+        self.text = text
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @classmethod
+    def from_response(cls, response):
+        """
+        Build an entry from a requests response.  Returns None if the response can't be
+        revalidated later, since then there's no point in caching it.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        if response.status_code != 200 or not (etag or last_modified):
+            return None
+
+        return cls.from_text(response.text, len(response.content), etag, last_modified)
+
+    @classmethod
+    def from_text(cls, text, size, etag=None, last_modified=None):
+        try:
+            body = json.loads(text)
+        except ValueError:
+            body = None
+
+        return cls(body, text, size, etag, last_modified)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class CachedResponse(object):
+    """
+    Stands in for a requests response when the body came out of the cache
+    """
+
+    status_code = 200
+
+    def __init__(self, entry, headers=None, wire_size=0, wire_status=None):
+        """
+        :param entry: The cached response
+        :param headers: The headers the server sent back
+        :param wire_size: How many body bytes actually came over the wire: the whole body
+                          for a fresh response, and none on a 304
+        :param wire_status: The status the server actually sent (e.g. 304), for metrics.
+                            None if nothing was sent.
+        """
+        super(CachedResponse, self).__init__()
+        self.entry = entry
+        self.headers = headers or {}
+        self.wire_size = wire_size
+        self.wire_status = wire_status
+
+    @property
+    def text(self):
+        return self.entry.text
+
+    @property
+    def content(self):
+        return self.entry.text.encode('utf-8')
+
+    def json(self):
+        if self.entry.body is None:
+            raise ValueError('No JSON object could be decoded')
+        return copy_json(self.entry.body)
+
+    def raise_for_status(self):
+        pass
+
+
+class ResponseCache(object):
+    """
+    An in-memory LRU cache of GET responses.  Every lookup is revalidated with the server
+    using If-None-Match / If-Modified-Since, and the cached body is served on a 304.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=50 * 1024 * 1024):
+        super(ResponseCache, self).__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    @property
+    def size(self):
+        """The total size in bytes of all the cached bodies"""
+        return self._size
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._size,
+        }
+
+    @staticmethod
+    def make_key(username, url, params=None):
+        return username, url, tuple(sorted((k, str(v)) for k, v in (params or {}).items()))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                # Mark it as most recently used
+                del self._entries[key]
+                self._entries[key] = entry
+                self.revalidations += 1
+            return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+
+            self._entries[key] = entry
+            self._size += entry.size
+
+            # Evict the least recently used entries until we're back under both limits
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def send(self, transport, url, username=None, **kwargs):
+        """
+        Send a GET request on the given transport, going through the cache
+
+        :param username: Who the request is for, so users never see each other's responses.
+                         Taken from the basic auth credentials if not given.
+        """
+        auth = kwargs.get('auth')
+        if username is None and auth:
+            username = auth[0]
+
+        key = self.make_key(username, url, kwargs.get('params'))
+
+        entry = self.get(key)
+
+        if entry is not None:
+            headers = dict(kwargs.get('headers') or {})
+            headers.update(entry.conditional_headers())
+            kwargs['headers'] = headers
+
+        response = transport.request('GET', url, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            self.hit()
+            return CachedResponse(entry, response.headers, wire_status=response.status_code)
+
+        new_entry = CacheEntry.from_response(response)
+
+        if new_entry is None:
+            # Not cacheable (anymore)
+            if entry is not None:
+                self.delete(key)
+            return response
+
+        self.set(key, new_entry)
+
+        return CachedResponse(new_entry, response.headers, wire_size=new_entry.size,
+                              wire_status=response.status_code)
+
+
+class DiskCache(object):
+    """
+    A persistent cache of GET responses with a fixed lifetime, shared between processes.
+    Entries are stored zlib compressed, one per file, laid out as::
+
+        <cache_dir>/<server & user hash>/<resource>/<url hash>
+
+    where resource is the first path segment under the api root (e.g. ``formulas``), so
+    that anything that modifies a resource can throw out all the cached lists for it.
+
+    Files are written to a temp file then renamed into place, so concurrent CLI processes
+    only ever see complete entries.
+
+    A running total of the cache's size is kept in ``<cache_dir>/size.json``, so the tree is
+    only walked when it goes over the cap.  Processes writing at the same time can lose each
+    other's updates, so the total is also re-measured every ``rescan_interval`` seconds.
+    """
+
+    size_file = 'size.json'
+
+    rescan_interval = 60 * 60
+
+    # Eviction makes this much room below the cap, so the next write doesn't go over again
+    evict_ratio = 0.9
+
+    def __init__(self, cache_dir, max_size=50 * 1024 * 1024):
+        super(DiskCache, self).__init__()
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build the cache described by a StackdioConfig.  It lives next to the config file
+        unless ``cache_dir`` is set.
+        """
+        cache_dir = config.get('cache_dir') or os.path.join(config.config_dir, 'cache')
+        max_size = int(config.get('cache_max_size', 50 * 1024 * 1024))
+        return cls(os.path.expanduser(cache_dir), max_size)
+
+    @staticmethod
+    def _hash(*parts):
+        return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _resource_dir(self, root_url, username, url):
+        relative = url[len(root_url):] if url.startswith(root_url) else urlparse(url).path
+        resource = relative.lstrip('/').split('/')[0].split('?')[0] or '_root'
+
+        return os.path.join(self.cache_dir,
+                            self._hash(root_url, username or '')[:16],
+                            resource)
+
+    def _path(self, root_url, username, url, params):
+        query = '&'.join('{0}={1}'.format(k, v) for k, v in sorted((params or {}).items()))
+        return os.path.join(self._resource_dir(root_url, username, url),
+                            self._hash(url, query))
+
+    def get(self, root_url, username, url, params=None):
+        """
+        Get a cached response, or None if there isn't a fresh one
+        """
+        path = self._path(root_url, username, url, params)
+
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            entry = json.loads(zlib.decompress(raw).decode('utf-8'))
+        except (IOError, OSError):
+            return None
+        except (ValueError, zlib.error):
+            # Corrupt - get rid of it
+            self._add_size(-self._remove(path))
+            return None
+
+        if entry['expires'] < time.time():
+            self._add_size(-self._remove(path))
+            return None
+
+        return CachedResponse(CacheEntry.from_text(entry['text'], len(raw)))
+
+    def set(self, root_url, username, url, params, response, ttl):
+        """
+        Store a successful response for ttl seconds
+        """
+        if response.status_code != 200:
+            return
+
+        path = self._path(root_url, username, url, params)
+        dirname = os.path.dirname(path)
+
+        raw = zlib.compress(json.dumps({
+            'url': url,
+            'expires': time.time() + ttl,
+            'text': response.text,
+        }).encode('utf-8'))
+
+        if len(raw) > self.max_size:
+            return
+
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+
+            fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(raw)
+            replace_file(tmp_path, path)
+        except (IOError, OSError):
+            # Another process may have removed the directory out from under us.  It's only
+            # a cache, so just skip it.
+            return
+
+        self._add_size(len(raw) - replaced)
+
+    def invalidate(self, root_url, username, url):
+        """
+        Throw out everything cached for the resource the url belongs to
+        """
+        resource_dir = self._resource_dir(root_url, username, url)
+
+        if not os.path.isdir(resource_dir):
+            return
+
+        removed = 0
+
+        for name in os.listdir(resource_dir):
+            removed += self._remove(os.path.join(resource_dir, name))
+
+        self._add_size(-removed)
+
+    def clear(self):
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                self._remove(os.path.join(dirpath, name))
+
+    def _size_path(self):
+        return os.path.join(self.cache_dir, self.size_file)
+
+    def _add_size(self, delta):
+        """
+        Update the running total of the cache's size, evicting entries if it's over the cap
+        """
+        if not delta or not os.path.isdir(self.cache_dir):
+            return
+
+        now = time.time()
+
+        try:
+            with open(self._size_path()) as f:
+                state = json.load(f)
+            size = int(state['size'])
+            scanned = float(state['scanned'])
+        except (IOError, OSError, ValueError, TypeError, KeyError):
+            size, scanned = None, 0
+
+        if size is None or now - scanned > self.rescan_interval:
+            size, scanned = self._evict(), now
+        else:
+            size = max(0, size + delta)
+
+            if size > self.max_size:
+                size, scanned = self._evict(), now
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'size': size, 'scanned': scanned}, f)
+            replace_file(tmp_path, self._size_path())
+        except (IOError, OSError):
+            pass
+
+    def _evict(self):
+        """
+        Measure the cache, and if it's over the size cap remove the oldest entries until
+        it's back under evict_ratio of the cap
+
+        :return: the size of the cache afterwards
+        """
+        entries = []
+        total = 0
+
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                if dirpath == self.cache_dir:
+                    # The size file
+                    continue
+
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_size:
+            return total
+
+        target = self.max_size * self.evict_ratio
+
+        for _, size, path in sorted(entries):
+            self._remove(path)
+            total -= size
+            if total <= target:
+                break
+
+        return total
+
+    @staticmethod
+    def _remove(path):
+        """
+        :return: the number of bytes freed
+        """
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return 0
+        return size
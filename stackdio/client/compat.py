@@ -21,3 +21,46 @@ try:
 except ImportError:
     # Python 3
     from configparser import ConfigParser, NoOptionError
+
+try:
+    # Python 2
+    from urllib import unquote, urlencode
+    from urlparse import parse_qsl, urlparse, urlunparse
+except ImportError:
+    # Python 3
+    from urllib.parse import parse_qsl, unquote, urlencode, urlparse, urlunparse
+
+try:
+    # Python 3
+    from os import replace as replace_file
+except ImportError:
+    # Python 2 - rename already overwrites atomically on posix
+    from os import rename as replace_file
+
+try:
+    # Python 3
+    from inspect import getfullargspec as getargspec
+except ImportError:
+    # Python 2
+    from inspect import getargspec
+
+try:
+    # Python 2
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    # Python 3
+    from socketserver import ThreadingMixIn
+
+try:
+    # Python 2
+    from StringIO import StringIO
+except ImportError:
+    # Python 3
+    from io import StringIO
+
+try:
+    # Python 2
+    string_types = basestring  # pylint: disable=invalid-name
+except NameError:
+    # Python 3
+    string_types = str
@@ -18,16 +18,18 @@
 import os
 
 import click
-import keyring
 import requests
 from requests.exceptions import ConnectionError, MissingSchema
 
 from stackdio.client.compat import ConfigParser, NoOptionError
+from stackdio.client.credentials import KEYRING_SERVICE, default_credentials
 
 
 CFG_DIR = os.path.join(os.path.expanduser('~'), '.stackdio')
 CFG_FILE = os.path.join(CFG_DIR, 'client.cfg')
 
+MISSING = object()
+
 
 class UserPath(click.Path):
 
@@ -40,7 +42,7 @@ class StackdioConfig(object):
     A wrapper around python's ConfigParser class
     """
 
-    KEYRING_SERVICE = 'stackdio_cli'
+    KEYRING_SERVICE = KEYRING_SERVICE
 
     BOOL_MAP = {
         str(True): True,
@@ -56,6 +58,9 @@ class StackdioConfig(object):
 
         self._config = ConfigParser()
 
+        # Parsed values, so repeated lookups don't go back through ConfigParser
+        self._values = {}
+
         self.usable_file = os.path.isfile(self._cfg_file)
 
         if self.usable_file:
@@ -67,6 +72,14 @@ class StackdioConfig(object):
         if not self.usable_section:
             self._config.add_section(section)
 
+        # Where passwords come from.  Nothing is looked up until a password is needed.
+        self.credentials = default_credentials(self.config_dir)
+
+    @property
+    def config_dir(self):
+        """The directory the config file lives in"""
+        return os.path.dirname(self._cfg_file)
+
     def save(self):
         full_path = os.path.dirname(self._cfg_file)
 
@@ -80,7 +93,7 @@ class StackdioConfig(object):
         username = username or self.get('username')
 
         if username is not None:
-            return keyring.get_password(self.KEYRING_SERVICE, username)
+            return self.credentials.get_password(username)
         else:
             return None
 
@@ -90,7 +103,7 @@ class StackdioConfig(object):
         if username is None:
             raise KeyError('Not username provided')
 
-        keyring.set_password(self.KEYRING_SERVICE, username, new_password)
+        self.credentials.set_password(username, new_password)
 
     def __contains__(self, item):
         try:
@@ -100,19 +113,30 @@ class StackdioConfig(object):
             return False
 
     def __getitem__(self, item):
-        try:
-            ret = self._config.get(self.section, item)
-            if ret in self.BOOL_MAP:
-                return self.BOOL_MAP[ret]
-            else:
-                return str(ret)
-        except NoOptionError:
+        if item not in self._values:
+            try:
+                ret = self._config.get(self.section, item)
+                if ret in self.BOOL_MAP:
+                    ret = self.BOOL_MAP[ret]
+                else:
+                    ret = str(ret)
+            except NoOptionError:
+                ret = MISSING
+
+            self._values[item] = ret
+
+        ret = self._values[item]
+
+        if ret is MISSING:
             raise KeyError(item)
 
+        return ret
+
     def __setitem__(self, key, value):
         if isinstance(value, bool):
             value = str(value)
         self._config.set(self.section, key, value)
+        self._values.pop(key, None)
 
     def get(self, item, default=None):
         try:
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Where the client gets passwords from.  The default chain looks at, in order: the
+STACKDIO_PASSWORD environment variable, a credentials file next to client.cfg, and the
+system keyring.  Whatever it finds is remembered for the life of the client.
+"""
+
+import os
+import threading
+
+from .compat import ConfigParser
+
+KEYRING_SERVICE = 'stackdio_cli'
+
+PASSWORD_ENV_VAR = 'STACKDIO_PASSWORD'
+
+CREDENTIALS_FILE = 'credentials'
+
+
+class CredentialProvider(object):
+    """
+    A source of passwords
+    """
+
+    def get_password(self, username):
+        """
+        :return: the password for username, or None if this provider doesn't have it
+        """
+        raise NotImplementedError()
+
+    def set_password(self, username, password):
+        raise NotImplementedError('{0} is read only'.format(self.__class__.__name__))
+
+
+class ExplicitCredentials(CredentialProvider):
+    """
+    A password passed in directly
+    """
+
+    def __init__(self, password, username=None):
+        """
+        :param password: The password
+        :param username: The only user the password is for.  None means any user.
+        """
+        super(ExplicitCredentials, self).__init__()
+        self.password = password
+        self.username = username
+
+    def get_password(self, username):
+        if self.username is None or self.username == username:
+            return self.password
+        return None
+
+
+class EnvironmentCredentials(CredentialProvider):
+    """
+    A password from an environment variable
+    """
+
+    def __init__(self, var=PASSWORD_ENV_VAR):
+        super(EnvironmentCredentials, self).__init__()
+        self.var = var
+
+    def get_password(self, username):
+        return os.environ.get(self.var) or None
+
+
+class FileCredentials(CredentialProvider):
+    """
+    Passwords from an ini style file with one ``username = password`` line per user::
+
+        [credentials]
+        admin = secret
+
+    Keep the file readable only by its owner.
+    """
+
+    SECTION = 'credentials'
+
+    def __init__(self, path):
+        super(FileCredentials, self).__init__()
+        self.path = path
+
+    def get_password(self, username):
+        if username is None or not os.path.isfile(self.path):
+            return None
+
+        parser = ConfigParser()
+        # Usernames are case sensitive
+        parser.optionxform = str
+        parser.read(self.path)
+
+        if parser.has_option(self.SECTION, username):
+            return parser.get(self.SECTION, username)
+        return None
+
+
+class KeyringCredentials(CredentialProvider):
+    """
+    Passwords stored in the system keyring.  keyring is only imported the first time it's
+    needed, since importing it is slow.
+    """
+
+    def __init__(self, service=KEYRING_SERVICE):
+        super(KeyringCredentials, self).__init__()
+        self.service = service
+
+    def get_password(self, username):
+        if username is None:
+            return None
+
+        import keyring
+        return keyring.get_password(self.service, username)
+
+    def set_password(self, username, password):
+        import keyring
+        keyring.set_password(self.service, username, password)
+
+
+class ChainCredentials(CredentialProvider):
+    """
+    Asks each provider in turn, and remembers the answer for each user (even when nobody
+    had a password) so the slow providers are only ever asked once.  Passwords are saved
+    with the first provider that can store them.
+    """
+
+    def __init__(self, providers):
+        super(ChainCredentials, self).__init__()
+        self.providers = list(providers)
+
+        self._passwords = {}
+        self._lock = threading.Lock()
+
+    def get_password(self, username):
+        if username in self._passwords:
+            return self._passwords[username]
+
+        with self._lock:
+            if username not in self._passwords:
+                password = None
+                for provider in self.providers:
+                    password = provider.get_password(username)
+                    if password is not None:
+                        break
+                self._passwords[username] = password
+
+            return self._passwords[username]
+
+    def set_password(self, username, password):
+        for provider in self.providers:
+            try:
+                provider.set_password(username, password)
+            except NotImplementedError:
+                continue
+
+            with self._lock:
+                self._passwords[username] = password
+            return
+
+        raise NotImplementedError('None of the credential providers can store passwords')
+
+    def forget(self, username=None):
+        """
+        Drop remembered passwords, for everyone if username is None
+        """
+        with self._lock:
+            if username is None:
+                self._passwords = {}
+            else:
+                self._passwords.pop(username, None)
+
+
+def default_credentials(config_dir, password=None, username=None):
+    """
+    The provider chain the client uses unless it's given one
+
+    :param config_dir: The directory the credentials file is in
+    :param password: An explicit password, which takes precedence over everything else
+    :param username: The user the explicit password is for
+    :rtype: ChainCredentials
+    """
+    providers = []
+
+    if password is not None:
+        providers.append(ExplicitCredentials(password, username))
+
+    providers.extend([
+        EnvironmentCredentials(),
+        FileCredentials(os.path.join(config_dir, CREDENTIALS_FILE)),
+        KeyringCredentials(),
+    ])
+
+    return ChainCredentials(providers)
@@ -34,3 +34,7 @@ class IncompatibleVersionException(Exception):
 
 class InvalidVersionStringException(ValueError):
     pass
+
+
+class CircuitOpenException(Exception):
+    pass
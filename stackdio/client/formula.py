@@ -15,10 +15,104 @@
 # limitations under the License.
 #
 
+import threading
+import time
+
+from .compat import urlparse
 from .http import HttpMixin, get, post, delete
 
 
 class FormulaMixin(HttpMixin):
+
+    # How long the uri -> formula catalog is trusted before the formulas are listed again
+    formula_catalog_ttl = 5 * 60
+
+    def __init__(self):
+        super(FormulaMixin, self).__init__()
+
+        # Every formula keyed by uri, and when it was fetched
+        self._formula_catalog = None
+        self._formula_catalog_time = 0
+
+        # Components keyed by (formula_id, version).  A pinned version doesn't change, so
+        # these are kept until the formula is updated or deleted.
+        self._component_cache = {}
+
+        self._formula_lock = threading.Lock()
+
+    def get_formula_catalog(self, refresh=False):
+        """
+        Get every formula keyed by uri.  The formulas are only listed again once the catalog
+        is older than formula_catalog_ttl.
+
+        :param refresh: List the formulas from the server again, even if the catalog (or the
+                        disk cache) is still fresh
+        :rtype: dict
+        """
+        with self._formula_lock:
+            expired = time.time() - self._formula_catalog_time > self.formula_catalog_ttl
+
+            if refresh or expired or self._formula_catalog is None:
+                self._formula_catalog = dict((formula['uri'], formula)
+                                             for formula in self.list_formulas(cache=not refresh))
+                self._formula_catalog_time = time.time()
+
+            return self._formula_catalog
+
+    def get_components_for_versions(self, formula_versions, concurrency=10):
+        """
+        Get the components of several formula versions.  Anything not already cached is
+        fetched concurrently, one request per distinct formula version.
+
+        :param formula_versions: (formula_id, version) pairs
+        :param concurrency: The max number of requests in flight at once
+        :return: the list of components for each pair, keyed by pair
+        :rtype: dict
+        """
+        formula_versions = [tuple(key) for key in formula_versions]
+
+        with self._formula_lock:
+            missing = sorted(set(key for key in formula_versions
+                                 if key not in self._component_cache))
+
+        if len(missing) == 1:
+            fetched = [self.list_components_for_version(*missing[0])]
+        elif missing:
+            results = self.map(self.list_components_for_version, missing, concurrency)
+            fetched = [result.get() for result in results]
+        else:
+            fetched = []
+
+        with self._formula_lock:
+            self._component_cache.update(zip(missing, fetched))
+            return dict((key, self._component_cache[key]) for key in formula_versions)
+
+    def _resource_changed(self, method, url):
+        super(FormulaMixin, self)._resource_changed(method, url)
+
+        # e.g. formulas/ for an import, or formulas/<id>/action/ for an update
+        path = urlparse(url[len(self.url):] if url.startswith(self.url) else url).path
+        parts = path.strip('/').split('/')
+
+        if parts[0] == 'formulas':
+            formula_id = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+            self.forget_formulas(formula_id)
+
+    def forget_formulas(self, formula_id=None):
+        """
+        Throw away the cached formula catalog, and the cached components of one formula (or
+        of every formula if formula_id is None)
+        """
+        with self._formula_lock:
+            self._formula_catalog = None
+
+            if formula_id is None:
+                self._component_cache = {}
+            else:
+                for key in list(self._component_cache):
+                    if key[0] == formula_id:
+                        del self._component_cache[key]
+
     @post('formulas/')
     def import_formula(self, formula_uri, git_username=None, git_password=None, access_token=None):
         """Import a formula"""
@@ -36,7 +130,7 @@ class FormulaMixin(HttpMixin):
 
         return data
 
-    @get('formulas/', paginate=True)
+    @get('formulas/', paginate=True, cache_ttl=5 * 60)
     def list_formulas(self, **kwargs):
         """Return all formulas"""
         pass
@@ -17,14 +17,25 @@
 
 from __future__ import print_function
 
+import copy
 import json
 import logging
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import update_wrapper
-from inspect import getcallargs
+from string import Formatter
 
-import requests
+from requests.exceptions import ConnectionError, Timeout
 
+from .batch import Batch, get_call_args
+from .compat import getargspec, parse_qsl, string_types, urlencode, urlparse, urlunparse
 from .exceptions import MissingUrlException
+from .metrics import Metrics
+from .retry import CircuitBreaker, RetryPolicy
+from .transport import RequestsTransport
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
@@ -44,10 +55,73 @@ class HttpMixin(object):
         'xml': {'content-type': 'application/xml'},
     }
 
+    # The Transport class used unless a transport is set explicitly
+    transport_class = RequestsTransport
+
+    # Connection pool settings for the default transport.  These may be overridden on the class
+    # or the instance, but they only take effect when the transport is (re)built.
+    pool_connections = 10  # The number of per-host pools to keep around
+    pool_maxsize = 10  # The max number of connections kept alive per host
+    pool_block = False  # Block instead of opening extra connections once a host pool is full
+    keep_alive = True
+
+    # An optional ResponseCache to send GET requests through
+    response_cache = None
+
+    # An optional DiskCache for endpoints declared with a cache_ttl
+    disk_cache = None
+
+    # How failed requests are retried.  Endpoints may override this in their decorator, and
+    # setting it to None turns retries off.
+    retry_policy = RetryPolicy()
+
+    # Log in once for an API token and send that instead of the password on every request.
+    # Servers without a token endpoint get basic auth.
+    token_auth = True
+
+    # Where to get a token from, relative to the api url
+    token_path = 'user/token/'
+
+    # How long to stick with basic auth after the token endpoint fails for some other
+    # reason than not existing (e.g. a 503), in seconds
+    token_retry_delay = 60
+
     def __init__(self):
         super(HttpMixin, self).__init__()
         self._http_log = logger
 
+        self._transport = None
+        self._transport_lock = threading.Lock()
+
+        # One circuit breaker per host
+        self._breakers = {}
+
+        self._metrics = Metrics()
+
+        # The current API token, and whether the server hands them out at all (None until
+        # we've asked)
+        self._token = None
+        self._token_supported = None
+        self._token_lock = threading.Lock()
+
+        # Whether the token (or the lack of support for them) has been loaded from wherever
+        # _load_token_state keeps it between clients
+        self._token_loaded = False
+
+        # When to try logging in for a token again after a failure
+        self._token_retry_at = 0
+
+        # The (username, password) the server last refused a token for.  No more tokens are
+        # asked for until the credentials change.
+        self._token_refused = None
+
+        # Functions called before every request is sent, as hook(method, endpoint, url, kwargs)
+        self.request_hooks = []
+
+        # Functions called after every response comes back, as
+        # hook(method, endpoint, url, response, elapsed)
+        self.response_hooks = []
+
         if not self.verify:
             if self._http_log.handlers:
                 self._http_log.warn(HTTP_INSECURE_MESSAGE)
@@ -76,12 +150,585 @@ class HttpMixin(object):
     def usable(self):
         raise NotImplementedError()
 
+    def _before_request(self):
+        """
+        Called before every endpoint request is sent (but not for each page of a list).
+        Subclasses can hook in here to do lazy setup; it does nothing by default.
+        """
+        pass
+
+    @property
+    def transport(self):
+        """
+        The transport every request goes through.  Unless one has been set, a pooled
+        requests session is built lazily so the pool settings can be changed up until the
+        first request.
+        """
+        if self._transport is None:
+            with self._transport_lock:
+                if self._transport is None:
+                    self._transport = self._build_transport()
+        return self._transport
+
+    @transport.setter
+    def transport(self, transport):
+        with self._transport_lock:
+            if self._transport is not None:
+                self._transport.close()
+            self._transport = transport
+
+    def _build_transport(self):
+        return self.transport_class(pool_connections=self.pool_connections,
+                                    pool_maxsize=self.pool_maxsize,
+                                    pool_block=self.pool_block,
+                                    keep_alive=self.keep_alive)
+
+    def _bind_request(self, request):
+        """
+        Bind an endpoint to this client.  Called every time an endpoint method is looked up.
+        """
+        return BoundRequest(request, self)
+
+    def _get_breaker(self, url, policy):
+        host = urlparse(url).netloc
+
+        with self._transport_lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host,
+                                                      policy.failure_threshold,
+                                                      policy.reset_timeout)
+            return self._breakers[host]
+
+    def _load_token_state(self):
+        """
+        Get the token and whether the server supports them, as remembered by an earlier
+        client.  Subclasses can keep these somewhere; nothing is kept by default.
+
+        :return: (token, supported), either of which may be None for unknown
+        :rtype: tuple
+        """
+        return None, None
+
+    def _save_token_state(self, token, supported):
+        """
+        Remember the token and whether the server supports them for later clients
+        """
+        pass
+
+    def _request_token(self, credentials):
+        """
+        Log in for a token.  Logging in again just hands back the same token, so unlike
+        other POSTs it goes through the retry policy.
+        """
+        url = self.url + self.token_path
+
+        def send():
+            return self.transport.request('POST',
+                                          url,
+                                          auth=credentials,
+                                          verify=self.verify,
+                                          headers={'Accept': 'application/json'})
+
+        policy, breaker = self._get_policy(url)
+
+        if not policy:
+            return send()
+
+        if 'POST' not in policy.methods:
+            policy = copy.copy(policy)
+            policy.methods = policy.methods | frozenset(['POST'])
+
+        return policy.send(send, 'POST', breaker)
+
+    def _get_token(self, stale=None):
+        """
+        Get an API token, logging in for one if we don't have one yet
+
+        :param stale: A token the server just rejected, which will be replaced
+        :return: the token, or None if the server doesn't support tokens or the login failed
+        """
+        with self._token_lock:
+            if not self._token_loaded:
+                self._token, self._token_supported = self._load_token_state()
+                self._token_loaded = True
+
+            if stale is not None and self._token == stale:
+                self._token = None
+                self._save_token_state(None, self._token_supported)
+
+            credentials = (self.username, self.password)
+
+            if not self._should_login(credentials):
+                return self._token
+
+            try:
+                response = self._request_token(credentials)
+            except (ConnectionError, Timeout):
+                # Let the real request go through the retry policy
+                self._token_retry_at = time.time() + self.token_retry_delay
+                return None
+
+            if response.status_code == 200:
+                try:
+                    body = response.json()
+                except ValueError:
+                    # e.g. an HTML catch-all page from a proxy
+                    body = None
+
+                token = body.get('token') if isinstance(body, dict) else None
+
+                if isinstance(token, string_types) and token:
+                    self._token = token
+                    self._token_supported = True
+                else:
+                    self._token_supported = False
+
+                self._save_token_state(self._token, self._token_supported)
+            elif response.status_code in (401, 403):
+                # Bad credentials.  Don't ask again until they change, and let basic auth
+                # produce the real error for this request.
+                self._http_log.debug('Unable to get an API token: {0}'.format(
+                    response.status_code))
+                self._token_refused = credentials
+            elif response.status_code in (404, 405):
+                # No token endpoint on this server
+                self._token_supported = False
+                self._save_token_state(None, False)
+            else:
+                # Probably temporary, so use basic auth for a while and then ask again
+                self._http_log.debug('Unable to get an API token: {0}'.format(
+                    response.status_code))
+                self._token_retry_at = time.time() + self.token_retry_delay
+
+            return self._token
+
+    def _should_login(self, credentials):
+        return self._token is None and self._token_supported is not False and \
+            self._token_refused != credentials and time.time() >= self._token_retry_at
+
+    def _needs_login(self, stale=None):
+        """
+        Whether _set_auth would have to log in to the server for a token (or load one)
+        """
+        if not self.token_auth or not self.username:
+            return False
+
+        if not self._token_loaded:
+            return True
+
+        if stale is not None and self._token == stale:
+            return True
+
+        return self._should_login((self.username, self.password))
+
+    def _set_auth(self, kwargs, stale=None):
+        """
+        Fill in the credentials for a request
+
+        :return: the token used, or None if basic auth is used
+        """
+        token = self._get_token(stale) if self.token_auth and self.username else None
+
+        headers = dict(kwargs.get('headers') or {})
+
+        if token is None:
+            # Drop a token that was rejected, so it isn't sent alongside the password
+            if headers.get('Authorization', '').startswith('Token '):
+                del headers['Authorization']
+                kwargs['headers'] = headers
+
+            kwargs['auth'] = (self.username, self.password)
+            return None
+
+        headers['Authorization'] = 'Token {0}'.format(token)
+        kwargs['headers'] = headers
+        kwargs['auth'] = None
+        return token
+
+    def _get_cached(self, method, url, cache_ttl, refresh, endpoint, kwargs):
+        """
+        Look a request up in the disk cache
+
+        :return: the cached response, or None
+        """
+        if self.disk_cache is None or method != 'GET' or not cache_ttl or refresh:
+            return None
+
+        cached = self.disk_cache.get(self.url, self.username, url, kwargs.get('params'))
+
+        if cached is not None:
+            self._metrics.record_cached(method, endpoint)
+
+        return cached
+
+    def _update_cache(self, method, url, cache_ttl, response, kwargs):
+        """
+        Store a fresh GET response in the disk cache, or throw out what a modifying request
+        made stale
+        """
+        if method in ('GET', 'HEAD', 'OPTIONS'):
+            if method == 'GET' and cache_ttl and self.disk_cache is not None:
+                self.disk_cache.set(self.url, self.username, url, kwargs.get('params'),
+                                    response, cache_ttl)
+            return
+
+        if self.disk_cache is not None:
+            # Anything cached for this resource may be out of date now
+            self.disk_cache.invalidate(self.url, self.username, url)
+
+        if response.status_code < 400:
+            self._resource_changed(method, url)
+
+    def _resource_changed(self, method, url):
+        """
+        Called after a request that modifies something succeeds, so subclasses can throw out
+        anything they keep in memory about it.  It does nothing by default.
+
+        :param url: The full url the request went to
+        """
+        pass
+
+    def _before_send(self, method, endpoint, url, kwargs):
+        """
+        Called right before every attempt at sending a request
+        """
+        for hook in self.request_hooks:
+            hook(method, endpoint, url, kwargs)
+
+    def _after_send(self, method, endpoint, url, kwargs, elapsed, attempt, page,
+                    response=None):
+        """
+        Called after every attempt at sending a request, with the response unless sending it
+        failed
+        """
+        bytes_out = len(kwargs.get('data') or '')
+
+        if response is None:
+            self._metrics.record(method, endpoint, elapsed,
+                                 bytes_out=bytes_out,
+                                 page=page and attempt == 0,
+                                 retry=attempt > 0)
+            return
+
+        # Responses from the response cache know what actually came over the wire
+        bytes_in = getattr(response, 'wire_size', None)
+        if bytes_in is None:
+            bytes_in = len(getattr(response, 'content', None) or b'')
+
+        status_code = getattr(response, 'wire_status', None) or response.status_code
+
+        self._metrics.record(method, endpoint, elapsed,
+                             status_code=status_code,
+                             bytes_in=bytes_in,
+                             bytes_out=bytes_out,
+                             page=page and attempt == 0,
+                             retry=attempt > 0)
+
+        for hook in self.response_hooks:
+            hook(method, endpoint, url, response, elapsed)
+
+    def _get_policy(self, url, retry=None):
+        """
+        :return: the retry policy for a request and the circuit breaker for its host, or
+                 (None, None) if it isn't retried
+        """
+        policy = self.retry_policy if retry is None else retry
+
+        if not policy:
+            return None, None
+
+        return policy, self._get_breaker(url, policy)
+
+    def _request(self, method, url, cache_ttl=None, retry=None, endpoint=None, page=False,
+                 refresh=False, **kwargs):
+        """
+        Send a single request on the transport, filling in our auth & ssl settings.  A
+        rejected token is refreshed and the request sent again.  The async client mirrors
+        this in AsyncHttpMixin._async_request, using the same helpers.
+
+        :param cache_ttl: How long a GET response may be served from the disk cache
+        :param retry: The RetryPolicy to use instead of the client's, or False for no retries
+        :param endpoint: The path template of the endpoint, for metrics
+        :param page: Whether this is a page of a paginated list, for metrics
+        :param refresh: Go to the server even if the disk cache has the response.  The fresh
+                        response still replaces the cached one.
+        """
+        kwargs.setdefault('verify', self.verify)
+
+        cached = self._get_cached(method, url, cache_ttl, refresh, endpoint, kwargs)
+        if cached is not None:
+            return cached
+
+        token = None if 'auth' in kwargs else self._set_auth(kwargs)
+
+        attempts = []
+
+        def send():
+            attempt = len(attempts)
+            attempts.append(url)
+
+            self._before_send(method, endpoint, url, kwargs)
+
+            start = time.time()
+
+            try:
+                if method == 'GET' and self.response_cache is not None:
+                    response = self.response_cache.send(self.transport, url,
+                                                        username=self.username, **kwargs)
+                else:
+                    response = self.transport.request(method, url, **kwargs)
+            except Exception:
+                self._after_send(method, endpoint, url, kwargs, time.time() - start, attempt,
+                                 page)
+                raise
+
+            self._after_send(method, endpoint, url, kwargs, time.time() - start, attempt, page,
+                             response)
+
+            return response
+
+        policy, breaker = self._get_policy(url, retry)
+
+        def send_with_retries():
+            if policy:
+                return policy.send(send, method, breaker)
+            return send()
+
+        response = send_with_retries()
+
+        if token is not None and response.status_code == 401:
+            # The token expired or was revoked
+            self._set_auth(kwargs, stale=token)
+            response = send_with_retries()
+
+        self._update_cache(method, url, cache_ttl, response, kwargs)
+
+        return response
+
+    def metrics(self):
+        """
+        Get the request metrics collected so far, keyed by endpoint (e.g. ``GET stacks/``)
+
+        :rtype: dict
+        """
+        return self._metrics.summary()
+
+    def reset_metrics(self):
+        """
+        Throw away the request metrics collected so far
+        """
+        self._metrics.reset()
+
+    def batch(self, concurrency=10):
+        """
+        Start a Batch of concurrent calls on this client
+        """
+        return Batch(self, concurrency)
+
+    def map(self, method, items, concurrency=10):
+        """
+        Call an endpoint once for every item, concurrently.  An exception in one call doesn't
+        stop the others; check each result's ``ok`` / ``exception``.
+
+        :param method: The method to call (e.g. ``client.get_stack``), or its name
+        :param items: The arguments for each call.  Tuples are passed as positional args,
+                      dicts as keyword args, and anything else as the only positional arg.
+        :param concurrency: The max number of calls in flight at once
+        :return: a BatchResult for each item, in the same order as the items
+        :rtype: list
+        """
+        with self.batch(concurrency) as batch:
+            for item in items:
+                args, kwargs = get_call_args(item)
+                batch.submit(method, *args, **kwargs)
+
+        return batch.results
+
+    def close(self):
+        """
+        Close all the pooled connections.  The client is still usable afterwards, the
+        transport will open new connections on the next request.
+        """
+        with self._transport_lock:
+            if self._transport is not None:
+                self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class BoundRequest(object):
+    """
+    An endpoint bound to a specific client, the equivalent of a bound method
+    """
+
+    def __init__(self, request, obj):
+        super(BoundRequest, self).__init__()
+        self.request = request
+        self.obj = obj
+        self.__doc__ = request.__doc__
+
+    def __getattr__(self, item):
+        # Fall back to the endpoint for things like __name__ and data_func
+        if item == 'request':
+            raise AttributeError(item)
+        return getattr(self.request, item)
+
+    def __repr__(self):
+        return ('<bound method HTTP {0} request for '
+                '\'/api/{1}\' on {2}>'.format(self.request.method, self.request.path,
+                                              repr(self.obj)))
+
+    def __call__(self, *args, **kwargs):
+        return self.request(self.obj, *args, **kwargs)
+
 
 def default_response(obj, response):
     return response
 
 
-def request(path, method, paginate=False, jsonify=True, **req_kwargs):
+class PageStream(object):
+    """
+    Iterates over the objects in a paginated list one page at a time, rather than loading
+    the whole list into memory first.  The next page is fetched in the background while the
+    current one is being consumed.
+    """
+
+    def __init__(self, first_page, get_page):
+        """
+        :param first_page: The already decoded first page of the list
+        :param get_page: A function that takes a page url and returns the decoded page
+        """
+        super(PageStream, self).__init__()
+        self.first_page = first_page
+        self.get_page = get_page
+
+        # The total number of objects, known as soon as we have the first page
+        self.count = first_page.get('count')
+
+    def __len__(self):
+        if self.count is None:
+            raise TypeError('The server didn\'t provide a count for this list')
+        return self.count
+
+    def __iter__(self):
+        page = self.first_page
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while page is not None:
+                next_url = page.get('next')
+                next_page = executor.submit(self.get_page, next_url) if next_url else None
+
+                for item in page['results']:
+                    yield item
+
+                page = next_page.result() if next_page else None
+
+
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def compile_path(path):
+    """
+    Parse a path template up front.  Returns the names of its placeholders, and a function
+    that fills them in from a dict of values, which is a good deal cheaper than str.format.
+    """
+    parsed = list(Formatter().parse(path))
+    fields = [field for _, field, _, _ in parsed if field is not None]
+
+    if not fields:
+        return fields, lambda values: path
+
+    if any(not IDENTIFIER.match(field) or spec or conversion
+           for _, field, spec, conversion in parsed if field is not None):
+        # Something fancier than plain {name} - just let format handle it
+        return fields, lambda values: path.format(**values)
+
+    template = ''.join(literal.replace('%', '%%') + ('%s' if field is not None else '')
+                       for literal, field, _, _ in parsed)
+
+    return fields, lambda values: template % tuple(values[field] for field in fields)
+
+
+def compile_binder(func, names):
+    """
+    Build a function that pulls the values of the given arguments out of the args & kwargs a
+    method was called with (not including self).  Works like a much cheaper
+    inspect.getcallargs that only looks up what we need.
+    """
+    if func is None or not names:
+        return lambda args, kwargs: {}
+
+    spec = getargspec(func)
+    arg_names = spec.args[1:]
+    defaults = dict(zip(reversed(spec.args), reversed(spec.defaults or ())))
+
+    lookups = [(name, arg_names.index(name) if name in arg_names else None) for name in names]
+
+    def bind(args, kwargs):
+        values = {}
+
+        for name, index in lookups:
+            if name in kwargs:
+                values[name] = kwargs[name]
+            elif index is not None and index < len(args):
+                values[name] = args[index]
+            elif name in defaults:
+                values[name] = defaults[name]
+            else:
+                raise TypeError('{0}() missing required argument \'{1}\''.format(
+                    func.__name__, name))
+
+        return values
+
+    return bind
+
+
+def get_page_urls(next_url, count, page_size):
+    """
+    Work out the urls of all the remaining pages of a paginated list from the first page.
+    Both page number and limit / offset style pagination are supported.
+
+    :param next_url: The ``next`` link from the first page
+    :param count: The total number of objects in the list
+    :param page_size: The number of objects on the first page
+    :return: the list of urls in page order, or None if they can't be determined
+    :rtype: list
+    """
+    if not count or not page_size:
+        return None
+
+    parts = urlparse(next_url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    params = dict(query)
+
+    try:
+        if 'page' in params:
+            num_pages = int(math.ceil(count / float(page_size)))
+            key = 'page'
+            values = range(int(params['page']), num_pages + 1)
+        elif 'offset' in params:
+            key = 'offset'
+            values = range(int(params['offset']), count, page_size)
+        else:
+            return None
+    except ValueError:
+        return None
+
+    urls = []
+
+    for value in values:
+        new_query = [(k, str(value) if k == key else v) for k, v in query]
+        urls.append(urlunparse(parts._replace(query=urlencode(new_query))))
+
+    return urls
+
+
+def request(path, method, paginate=False, jsonify=True, concurrency=None, cache_ttl=None,
+            retry=None, **req_kwargs):
 
     # Define a class here that uses the path / method we want.  We need it inside this function
     # so we have access to the path / method.
@@ -92,7 +739,12 @@ def request(path, method, paginate=False, jsonify=True, **req_kwargs):
             if dfunc:
                 update_wrapper(self, dfunc)
 
-            self.obj = None
+            self.method = method
+            self.path = path
+            self.cache_ttl = cache_ttl
+            self.retry = retry
+            self.paginate = method == 'GET' and paginate and jsonify
+            self.jsonify = jsonify
 
             self.data_func = dfunc
             self.response_func = rfunc or default_response
@@ -103,72 +755,94 @@ def request(path, method, paginate=False, jsonify=True, **req_kwargs):
 
             self._http_log = logging.getLogger(__name__)
 
+            # Do all the introspection once here instead of on every call
+            fields, self._fill_path = compile_path(path)
+            self._bind = compile_binder(dfunc, fields)
+
         def data(self, dfunc):
             return type(self)(dfunc, self.response_func, self.quiet)
 
         def response(self, rfunc):
             return type(self)(self.data_func, rfunc, self.quiet)
 
-        def __repr__(self):
-            if self.obj:
-                return ('<bound method HTTP {0} request for '
-                        '\'/api/{1}\' on {2}>'.format(method, path, repr(self.obj)))
-            else:
-                return super(Request, self).__repr__()
-
-        # We need this so we can save the client object as an attribute, and then it can be used
-        # in __call__
+        # Every time the method is looked up on a client we hand back a new bound endpoint, so
+        # nothing about the client is ever stored on this (shared) object.  That keeps
+        # clients safe to use from multiple threads.
         def __get__(self, obj, objtype=None):
-            if objtype:
-                assert issubclass(objtype, HttpMixin)
+            if obj is None:
+                return self
+
             assert isinstance(obj, HttpMixin)
 
-            self.obj = obj
-            return self
+            return obj._bind_request(self)
 
-        # Here's how the request actually happens
-        def __call__(self, *args, **kwargs):
-            assert isinstance(self.obj, HttpMixin)
+        def prepare(self, obj, args, kwargs):
+            """
+            Work out everything needed to send the request.  This is shared between the sync
+            and async clients, so it must not do any I/O itself.
 
-            if not self.obj.usable():
+            :return: the url, the encoded body, the query params, and the call options
+            :rtype: tuple
+            """
+            if not obj.usable():
                 raise MissingUrlException('No url is set.  Please run `configure`.')
 
-            none_on_404 = kwargs.pop('none_on_404', False)
-            raise_for_status = kwargs.pop('raise_for_status', True)
+            options = {
+                'none_on_404': kwargs.pop('none_on_404', False),
+                'raise_for_status': kwargs.pop('raise_for_status', True),
+                'concurrency': kwargs.pop('concurrency', None) or concurrency or 1,
+                'stream': kwargs.pop('stream', False),
+                'cache': kwargs.pop('cache', True),
+            }
 
-            # Get what locals() would return directly after calling
-            # 'func' with the given args and kwargs
-            future_locals = getcallargs(self.data_func, *((self.obj,) + args), **kwargs)
+            if options['stream'] and self.paginate and self.response_func is not default_response:
+                # The response func expects the full list, so streamed pages would skip it
+                name = getattr(self, '__name__', path)
+                raise ValueError('{0} can\'t be streamed, since its response is processed once '
+                                 'every page has been fetched'.format(name))
 
-            # Build the variable we'll inject
-            url = '{url}{path}'.format(
-                url=self.obj.url,
-                path=path.format(**future_locals)
-            )
+            url = obj.url + self._fill_path(self._bind(args, kwargs))
 
             if not self.quiet:
                 self._http_log.info("%s: %s", method, url)
 
             data = None
             if self.data_func:
-                data = json.dumps(self.data_func(self.obj, *args, **kwargs))
+                body = self.data_func(obj, *args, **kwargs)
+
+                # Don't bother sending a body for endpoints that don't have one
+                if body is not None:
+                    data = json.dumps(body)
+
+            return url, data, kwargs, options
 
-            result = requests.request(method,
-                                      url,
-                                      data=data,
-                                      auth=(self.obj.username, self.obj.password),
-                                      headers=self.headers,
-                                      params=kwargs,
-                                      verify=self.obj.verify)
+        # Here's how the request actually happens
+        def __call__(self, obj, *args, **kwargs):
+            assert isinstance(obj, HttpMixin)
+
+            url, data, params, options = self.prepare(obj, args, kwargs)
+
+            obj._before_request()
+
+            result = obj._request(method,
+                                  url,
+                                  cache_ttl=cache_ttl,
+                                  retry=retry,
+                                  endpoint=path,
+                                  page=self.paginate,
+                                  refresh=not options['cache'],
+                                  data=data,
+                                  headers=self.headers,
+                                  params=params)
 
             # Handle special conditions
-            if none_on_404 and result.status_code == 404:
+            if options['none_on_404'] and result.status_code == 404:
                 return None
 
             elif result.status_code == 204:
                 return None
 
-            elif raise_for_status:
+            elif options['raise_for_status']:
                 try:
                     result.raise_for_status()
                 except Exception:
@@ -180,54 +854,82 @@ def request(path, method, paginate=False, jsonify=True, **req_kwargs):
             else:
                 response = result.text
 
-            if method == 'GET' and paginate and jsonify:
+            if self.paginate:
+                def get_page(page_url):
+                    page = obj._request(method,
+                                        page_url,
+                                        cache_ttl=cache_ttl,
+                                        retry=retry,
+                                        endpoint=path,
+                                        page=True,
+                                        refresh=not options['cache'],
+                                        data=data,
+                                        headers=self.headers,
+                                        params=params)
+                    page.raise_for_status()
+                    return page.json()
+
+                if options['stream']:
+                    # Hand back the pages lazily.  prepare() won't allow this for endpoints
+                    # with a response func.
+                    return PageStream(response, get_page)
+
                 res = response['results']
 
                 next_url = response.get('next')
 
-                while next_url:
-                    next_page = requests.request(method,
-                                                 next_url,
-                                                 data=data,
-                                                 auth=(self.obj.username, self.obj.password),
-                                                 headers=self.headers,
-                                                 params=kwargs,
-                                                 verify=self.obj.verify).json()
-                    res.extend(next_page['results'])
-                    next_url = next_page.get('next')
+                page_urls = None
+
+                if next_url and options['concurrency'] > 1:
+                    page_urls = get_page_urls(next_url, response.get('count'), len(res))
+
+                if page_urls:
+                    # We know every remaining page up front, so grab them all at once
+                    workers = min(options['concurrency'], len(page_urls))
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        # map() hands the pages back in order
+                        for next_page in executor.map(get_page, page_urls):
+                            res.extend(next_page['results'])
+                else:
+                    # Fall back to following the next links one at a time
+                    while next_url:
+                        next_page = get_page(next_url)
+                        res.extend(next_page['results'])
+                        next_url = next_page.get('next')
 
                 response = res
 
             # now process the result
-            return self.response_func(self.obj, response)
+            return self.response_func(obj, response)
 
     return Request
 
 
 # Define the decorators for all the methods
-def get(path, paginate=False, jsonify=True):
-    return request(path, 'GET', paginate=paginate, jsonify=jsonify)
+def get(path, paginate=False, jsonify=True, concurrency=None, cache_ttl=None, retry=None):
+    return request(path, 'GET', paginate=paginate, jsonify=jsonify, concurrency=concurrency,
+                   cache_ttl=cache_ttl, retry=retry)
 
 
-def head(path):
-    return request(path, 'HEAD')
+def head(path, retry=None):
+    return request(path, 'HEAD', retry=retry)
 
 
-def options(path):
-    return request(path, 'OPTIONS')
+def options(path, retry=None):
+    return request(path, 'OPTIONS', retry=retry)
 
 
-def post(path):
-    return request(path, 'POST')
+def post(path, retry=None):
+    return request(path, 'POST', retry=retry)
 
 
-def put(path):
-    return request(path, 'PUT')
+def put(path, retry=None):
+    return request(path, 'PUT', retry=retry)
 
 
-def patch(path):
-    return request(path, 'PATCH')
+def patch(path, retry=None):
+    return request(path, 'PATCH', retry=retry)
 
 
-def delete(path):
-    return request(path, 'DELETE')
+def delete(path, retry=None):
+    return request(path, 'DELETE', retry=retry)
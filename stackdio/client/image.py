@@ -31,7 +31,7 @@ class ImageMixin(HttpMixin):
             "default_instance_size": default_instance_size
         }
 
-    @get('cloud/images/', paginate=True)
+    @get('cloud/images/', paginate=True, cache_ttl=60 * 60)
     def list_images(self, **kwargs):
         """List all images"""
         pass
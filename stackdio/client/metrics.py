@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import random
+import threading
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    index = int(round(pct / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+class EndpointMetrics(object):
+    """
+    Everything recorded for one endpoint
+    """
+
+    # Keep at most this many latency samples per endpoint.  Past that we switch to reservoir
+    # sampling, so memory stays flat in long running processes.
+    MAX_SAMPLES = 10000
+
+    STATUS_CLASSES = ('2xx', '3xx', '4xx', '5xx', 'error')
+
+    def __init__(self):
+        super(EndpointMetrics, self).__init__()
+        self.requests = 0
+        self.statuses = dict((c, 0) for c in self.STATUS_CLASSES)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.pages = 0
+        self.retries = 0
+        self.cached = 0
+        self.total_time = 0.0
+
+        self._samples = []
+
+    def add_latency(self, elapsed):
+        self.total_time += elapsed
+
+        if len(self._samples) < self.MAX_SAMPLES:
+            self._samples.append(elapsed)
+        else:
+            index = random.randint(0, self.requests - 1)
+            if index < self.MAX_SAMPLES:
+                self._samples[index] = elapsed
+
+    def as_dict(self):
+        samples = sorted(self._samples)
+        return {
+            'requests': self.requests,
+            'statuses': dict(self.statuses),
+            'p50': percentile(samples, 50),
+            'p95': percentile(samples, 95),
+            'p99': percentile(samples, 99),
+            'total_time': self.total_time,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'pages': self.pages,
+            'retries': self.retries,
+            'cached': self.cached,
+        }
+
+
+class Metrics(object):
+    """
+    Collects request metrics per endpoint template (e.g. ``GET stacks/{stack_id}/``), not per
+    formatted url, so all the calls to one endpoint get lumped together.
+    """
+
+    def __init__(self):
+        super(Metrics, self).__init__()
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _get(self, method, endpoint):
+        key = '{0} {1}'.format(method, endpoint or '<unknown>')
+        if key not in self._endpoints:
+            self._endpoints[key] = EndpointMetrics()
+        return self._endpoints[key]
+
+    def record(self, method, endpoint, elapsed, status_code=None, bytes_in=0, bytes_out=0,
+               page=False, retry=False):
+        """
+        Record a single request that was sent to the server.  A status_code of None means the
+        request failed without a response.
+        """
+        if status_code is None:
+            status_class = 'error'
+        else:
+            status_class = '{0}xx'.format(status_code // 100)
+
+        with self._lock:
+            metrics = self._get(method, endpoint)
+            metrics.requests += 1
+            if status_class in metrics.statuses:
+                metrics.statuses[status_class] += 1
+            metrics.add_latency(elapsed)
+            metrics.bytes_in += bytes_in
+            metrics.bytes_out += bytes_out
+            if page:
+                metrics.pages += 1
+            if retry:
+                metrics.retries += 1
+
+    def record_cached(self, method, endpoint):
+        """
+        Record a call that was answered from the disk cache without touching the server
+        """
+        with self._lock:
+            self._get(method, endpoint).cached += 1
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def summary(self):
+        with self._lock:
+            return dict((k, v.as_dict()) for k, v in self._endpoints.items())
+
+
+def format_table(summary):
+    """
+    Render a Metrics summary as a plain text table
+    """
+    headers = ('endpoint', 'reqs', '2xx', '3xx', '4xx', '5xx', 'err', 'p50 ms', 'p95 ms',
+               'p99 ms', 'KB in', 'KB out', 'pages', 'retries', 'cached')
+
+    def ms(value):
+        return '-' if value is None else '{0:.1f}'.format(value * 1000)
+
+    rows = []
+    for endpoint in sorted(summary, key=lambda k: -summary[k]['total_time']):
+        m = summary[endpoint]
+        rows.append((
+            endpoint,
+            str(m['requests']),
+            str(m['statuses']['2xx']),
+            str(m['statuses']['3xx']),
+            str(m['statuses']['4xx']),
+            str(m['statuses']['5xx']),
+            str(m['statuses']['error']),
+            ms(m['p50']),
+            ms(m['p95']),
+            ms(m['p99']),
+            '{0:.1f}'.format(m['bytes_in'] / 1024.0),
+            '{0:.1f}'.format(m['bytes_out'] / 1024.0),
+            str(m['pages']),
+            str(m['retries']),
+            str(m['cached']),
+        ))
+
+    widths = [max(len(row[i]) for row in [headers] + rows) for i in range(len(headers))]
+
+    lines = []
+    for row in [headers] + rows:
+        cells = [row[0].ljust(widths[0])]
+        cells.extend(cell.rjust(width) for cell, width in zip(row[1:], widths[1:]))
+        lines.append('  '.join(cells))
+
+    lines.insert(1, '  '.join('-' * w for w in widths))
+
+    return '\n'.join(lines)
@@ -19,7 +19,7 @@ from .http import HttpMixin, get
 
 
 class RegionMixin(HttpMixin):
-    @get('cloud/providers/{provider_name}/regions/', paginate=True)
+    @get('cloud/providers/{provider_name}/regions/', paginate=True, cache_ttl=24 * 60 * 60)
     def list_regions(self, provider_name, **kwargs):
         pass
 
@@ -27,7 +27,7 @@ class RegionMixin(HttpMixin):
     def get_region(self, provider_name, region_id):
         pass
 
-    @get('cloud/providers/{provider_name}/zones/', paginate=True)
+    @get('cloud/providers/{provider_name}/zones/', paginate=True, cache_ttl=24 * 60 * 60)
     def list_zones(self, provider_name, **kwargs):
         pass
 
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import calendar
+import random
+import threading
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+from requests.exceptions import ConnectionError, Timeout
+
+from .exceptions import CircuitOpenException
+
+
+class RetryPolicy(object):
+    """
+    Decides which failed requests get retried, and how long to wait in between.  Waits use
+    "decorrelated jitter" backoff, unless the server asks for a specific delay with a
+    Retry-After header.
+    """
+
+    IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+    RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+    def __init__(self, max_retries=3, backoff_base=0.5, backoff_cap=30.0, methods=None,
+                 statuses=None, max_retry_after=120, failure_threshold=5, reset_timeout=30.0):
+        """
+        :param max_retries: The max number of times to retry a single request
+        :param backoff_base: The minimum wait between attempts, in seconds
+        :param backoff_cap: The maximum wait between attempts, in seconds
+        :param methods: The HTTP methods that are safe to retry
+        :param statuses: The status codes that get retried
+        :param max_retry_after: Give up instead of honoring a longer Retry-After than this
+        :param failure_threshold: The number of failures in a row before a host's circuit
+                                  breaker opens
+        :param reset_timeout: How long an open circuit breaker waits before letting a
+                              trial request through
+        """
+        super(RetryPolicy, self).__init__()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.methods = frozenset(methods) if methods is not None else self.IDEMPOTENT_METHODS
+        self.statuses = frozenset(statuses) if statuses is not None else self.RETRY_STATUSES
+        self.max_retry_after = max_retry_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    def can_retry(self, method, attempt):
+        return method in self.methods and attempt < self.max_retries
+
+    def backoff(self, previous=None):
+        """
+        Get the next wait time given the previous one
+        """
+        previous = previous or self.backoff_base
+        return min(self.backoff_cap, random.uniform(self.backoff_base, previous * 3))
+
+    @staticmethod
+    def get_retry_after(response):
+        """
+        Parse the Retry-After header, which is either a number of seconds or an HTTP date
+        """
+        value = response.headers.get('Retry-After')
+
+        if not value:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        parsed = parsedate_tz(value)
+
+        if parsed is None:
+            return None
+
+        return max(0.0, mktime_tz(parsed) - calendar.timegm(time.gmtime()))
+
+    def next_wait(self, method, attempt, wait, breaker, response=None):
+        """
+        Record the outcome of one attempt with the circuit breaker, and decide whether to
+        try again.  This is the part of send() shared with the async client.
+
+        :param method: The HTTP method of the request
+        :param attempt: How many attempts came before this one
+        :param wait: The previous wait, if any
+        :param breaker: The circuit breaker for the host the request went to
+        :param response: The response, or None if the request couldn't be sent at all
+        :return: how long to wait before trying again, or None to give up (returning the
+                 response, or re-raising the error)
+        """
+        if response is None:
+            breaker.record_failure()
+            if breaker.is_open or not self.can_retry(method, attempt):
+                return None
+            return self.backoff(wait)
+
+        if response.status_code not in self.statuses:
+            breaker.record_success()
+            return None
+
+        if response.status_code >= 500:
+            # A 429 just means slow down, it doesn't mean the server is down
+            breaker.record_failure()
+
+        if breaker.is_open or not self.can_retry(method, attempt):
+            return None
+
+        retry_after = self.get_retry_after(response)
+
+        if retry_after is None:
+            return self.backoff(wait)
+        elif retry_after > self.max_retry_after:
+            return None
+        else:
+            return retry_after
+
+    def send(self, send, method, breaker):
+        """
+        Send a request with retries
+
+        :param send: A function that sends the request once and returns the response
+        :param method: The HTTP method of the request
+        :param breaker: The circuit breaker for the host the request is going to
+        :return: the final response
+        """
+        attempt = 0
+        wait = None
+
+        while True:
+            breaker.before_request()
+
+            try:
+                response = send()
+            except (ConnectionError, Timeout):
+                wait = self.next_wait(method, attempt, wait, breaker)
+                if wait is None:
+                    raise
+            else:
+                wait = self.next_wait(method, attempt, wait, breaker, response)
+                if wait is None:
+                    return response
+
+            attempt += 1
+            time.sleep(wait)
+
+
+class CircuitBreaker(object):
+    """
+    Tracks consecutive failures for one host.  Once there have been too many, requests fail
+    immediately for a while instead of piling more load on a server that's down.  After
+    that a single trial request is let through to see whether it has recovered.
+    """
+
+    def __init__(self, host, failure_threshold=5, reset_timeout=30.0):
+        super(CircuitBreaker, self).__init__()
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at = None
+
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def before_request(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+
+            if time.time() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenException(
+                    'Too many failed requests to {0}, not trying again for {1:.0f} '
+                    'seconds.'.format(self.host,
+                                      self.reset_timeout - (time.time() - self.opened_at))
+                )
+
+            # Half open - let this request through as a trial.  Another failure re-opens it.
+            self.opened_at = None
+            self.failures = self.failure_threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
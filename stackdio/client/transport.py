@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Transports actually put requests on the wire (or not, in the case of the WSGI transport).
+They all take the same arguments as ``requests.Session.request`` (method, url, data,
+headers, params, auth, verify) and return something that looks like a requests response
+(status_code, headers, content, text, json() and raise_for_status()).
+"""
+
+import base64
+import io
+import json
+import sys
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, HTTPError, Timeout
+from requests.structures import CaseInsensitiveDict
+
+from .compat import string_types, unquote, urlencode, urlparse
+
+
+class Transport(object):
+    """
+    The interface all transports implement
+    """
+
+    def request(self, method, url, data=None, headers=None, params=None, auth=None,
+                verify=True):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    The default transport - a pooled requests session
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True):
+        super(RequestsTransport, self).__init__()
+        self.session = requests.Session()
+
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class Response(object):
+    """
+    A minimal requests-like response for the transports that don't use requests
+    """
+
+    def __init__(self, status_code, headers, content, url, reason=''):
+        super(Response, self).__init__()
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.url = url
+        self.reason = reason
+
+    @property
+    def encoding(self):
+        content_type = self.headers.get('Content-Type', '')
+        for param in content_type.split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'charset' and value:
+                return value.strip('"\'')
+        return 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, 'replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            raise HTTPError('{0} {1} Error: {2} for url: {3}'.format(
+                self.status_code, kind, self.reason, self.url), response=self)
+
+
+def build_url(url, params):
+    """
+    Add query params to a url the same way requests does (None values are dropped)
+    """
+    params = [(k, v) for k, v in sorted((params or {}).items()) if v is not None]
+
+    if not params:
+        return url
+
+    separator = '&' if '?' in url else '?'
+    return url + separator + urlencode(params, doseq=True)
+
+
+def build_headers(headers, data, auth, keep_alive=True):
+    headers = dict(headers or {})
+
+    if auth is not None:
+        credentials = '{0}:{1}'.format(*auth).encode('utf-8')
+        headers['Authorization'] = 'Basic ' + base64.b64encode(credentials).decode('ascii')
+
+    if data is not None:
+        headers['Content-Length'] = str(len(data))
+
+    if not keep_alive:
+        headers['Connection'] = 'close'
+
+    return headers
+
+
+def encode_body(data):
+    if data is not None and not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return data
+
+
+class Urllib3Transport(Transport):
+    """
+    Talks to urllib3 directly, skipping all the per-request work requests does
+    (hooks, cookies, proxy env lookups, redirect handling).  Redirects are not followed.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True):
+        super(Urllib3Transport, self).__init__()
+        from requests.packages import urllib3
+        from requests.utils import DEFAULT_CA_BUNDLE_PATH
+
+        self._urllib3 = urllib3
+        self.keep_alive = keep_alive
+
+        self.pool_kwargs = {
+            'num_pools': pool_connections,
+            'maxsize': pool_maxsize,
+            'block': pool_block,
+            'retries': False,
+        }
+
+        # Keyed by the verify argument - True, False, or the path of a CA bundle
+        self.pools = {
+            True: urllib3.PoolManager(cert_reqs='CERT_REQUIRED', ca_certs=DEFAULT_CA_BUNDLE_PATH,
+                                      **self.pool_kwargs),
+            False: urllib3.PoolManager(cert_reqs='CERT_NONE', **self.pool_kwargs),
+        }
+        self._pools_lock = threading.Lock()
+
+    def get_pool(self, verify):
+        """
+        Get the pool manager for a verify argument.  Like requests, verify may be the path of
+        a CA bundle, in which case certificates are checked against that bundle.
+        """
+        if not isinstance(verify, string_types):
+            return self.pools[bool(verify)]
+
+        with self._pools_lock:
+            if verify not in self.pools:
+                self.pools[verify] = self._urllib3.PoolManager(cert_reqs='CERT_REQUIRED',
+                                                               ca_certs=verify,
+                                                               **self.pool_kwargs)
+            return self.pools[verify]
+
+    def request(self, method, url, data=None, headers=None, params=None, auth=None,
+                verify=True):
+        data = encode_body(data)
+        full_url = build_url(url, params)
+
+        try:
+            resp = self.get_pool(verify).urlopen(method,
+                                                 full_url,
+                                                 body=data,
+                                                 headers=build_headers(headers, data, auth,
+                                                                       self.keep_alive),
+                                                 redirect=False)
+        except self._urllib3.exceptions.TimeoutError as e:
+            raise Timeout(e)
+        except self._urllib3.exceptions.HTTPError as e:
+            raise ConnectionError(e)
+
+        return Response(resp.status, resp.headers, resp.data, full_url, resp.reason)
+
+    def close(self):
+        with self._pools_lock:
+            pools = list(self.pools.values())
+
+        for pool in pools:
+            pool.clear()
+
+
+class WSGITransport(Transport):
+    """
+    Calls a WSGI application in-process instead of going over the network.  Handy for tests
+    and for benchmarking the client's own overhead.
+    """
+
+    def __init__(self, app):
+        super(WSGITransport, self).__init__()
+        self.app = app
+
+    def build_environ(self, method, url, data, headers):
+        parts = urlparse(url)
+
+        host, _, port = parts.netloc.rpartition('@')[2].partition(':')
+
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote(parts.path),
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': host or 'localhost',
+            'SERVER_PORT': port or ('443' if parts.scheme == 'https' else '80'),
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': str(len(data or b'')),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': parts.scheme or 'http',
+            'wsgi.input': io.BytesIO(data or b''),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+
+        for name, value in headers.items():
+            key = name.upper().replace('-', '_')
+            if key == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif key != 'CONTENT_LENGTH':
+                environ['HTTP_' + key] = value
+
+        environ['HTTP_HOST'] = parts.netloc.rpartition('@')[2]
+
+        return environ
+
+    def request(self, method, url, data=None, headers=None, params=None, auth=None,
+                verify=True):
+        data = encode_body(data)
+        full_url = build_url(url, params)
+
+        environ = self.build_environ(method, full_url, data, build_headers(headers, data, auth))
+
+        status_line = []
+        response_headers = []
+
+        def start_response(status, headers, exc_info=None):
+            status_line[:] = [status]
+            response_headers[:] = headers
+
+        result = self.app(environ, start_response)
+
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+        code, _, reason = status_line[0].partition(' ')
+
+        return Response(int(code), response_headers, content, full_url, reason)
+
+
+# The transports that can be picked by name, e.g. with the ``transport`` config option
+TRANSPORTS = {
+    'requests': RequestsTransport,
+    'urllib3': Urllib3Transport,
+}
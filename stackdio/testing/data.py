@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import itertools
+import random
+import threading
+
+PROVIDERS = ('ec2',)
+
+REGIONS = ('us-east-1', 'us-west-1', 'us-west-2', 'eu-west-1')
+
+STACK_STATUSES = ('finished', 'launching', 'provisioning', 'orchestrating', 'error')
+
+HOST_STATES = ('running', 'pending', 'stopped')
+
+STACK_ACTIONS = ['launch', 'terminate', 'start', 'stop', 'provision', 'orchestrate',
+                 'single-sls', 'propagate-ssh']
+
+LOG_TYPES = (
+    ('provisioning', 'log'),
+    ('provisioning', 'err'),
+    ('orchestration', 'log'),
+    ('orchestration', 'err'),
+    ('launch', 'log'),
+)
+
+
+class Dataset(object):
+    """
+    The in-memory data behind the fake server.  Everything is generated up front from a
+    seeded random generator, so the same arguments always give the same data.  Objects are
+    stored by id in one dict per resource; the nested resources (hosts, history, ...) are
+    keyed by the id of their parent.
+    """
+
+    def __init__(self, stacks=20, hosts_per_stack=5, history_per_stack=20, blueprints=10,
+                 formulas=10, components_per_formula=5, accounts=2, images=10, snapshots=5,
+                 seed=0):
+        """
+        :param stacks: The number of stacks to create
+        :param hosts_per_stack: The number of hosts in each stack
+        :param history_per_stack: The number of history entries for each stack
+        :param blueprints: The number of blueprints to create
+        :param formulas: The number of formulas to create
+        :param components_per_formula: The number of components in each formula
+        :param accounts: The number of cloud accounts to create
+        :param images: The number of images to create
+        :param snapshots: The number of snapshots to create
+        :param seed: The seed for the random generator
+        """
+        super(Dataset, self).__init__()
+        self.random = random.Random(seed)
+
+        self.providers = {}
+        self.regions = {}
+        self.zones = {}
+        self.accounts = {}
+        self.images = {}
+        self.snapshots = {}
+        self.formulas = {}
+        self.components = {}
+        self.blueprints = {}
+        self.stacks = {}
+        self.hosts = {}
+        self.history = {}
+        self.commands = {}
+        self.security_groups = {}
+        self.rules = {}
+
+        self.user = {
+            'username': 'test',
+            'first_name': 'Test',
+            'last_name': 'User',
+            'email': 'test@example.com',
+            'settings': {
+                'public_key': '',
+                'advanced_view': False,
+            },
+        }
+
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        self.populate(stacks, hosts_per_stack, history_per_stack, blueprints, formulas,
+                      components_per_formula, accounts, images, snapshots)
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def populate(self, stacks, hosts_per_stack, history_per_stack, blueprints, formulas,
+                 components_per_formula, accounts, images, snapshots):
+        for name in PROVIDERS:
+            self.providers[name] = {'id': self.next_id(), 'name': name}
+            self.regions[name] = {}
+            self.zones[name] = {}
+
+            for region in REGIONS:
+                region_id = self.next_id()
+                self.regions[name][region_id] = {'id': region_id, 'title': region}
+
+                for suffix in 'abc':
+                    zone_id = self.next_id()
+                    self.zones[name][zone_id] = {
+                        'id': zone_id,
+                        'title': region + suffix,
+                        'region': region,
+                    }
+
+        for _ in range(accounts):
+            self.add_account({'provider': PROVIDERS[0], 'region': REGIONS[0]})
+
+        account_ids = sorted(self.accounts)
+
+        for _ in range(images):
+            self.add_image({'account': self.random.choice(account_ids),
+                            'image_id': 'ami-{0:08x}'.format(self.random.getrandbits(32)),
+                            'ssh_user': 'root'})
+
+        for _ in range(snapshots):
+            self.add_snapshot({'account': self.random.choice(account_ids),
+                               'snapshot_id': 'snap-{0:08x}'.format(self.random.getrandbits(32)),
+                               'size_in_gb': self.random.choice([10, 20, 50, 100]),
+                               'filesystem_type': 'ext4'})
+
+        for _ in range(formulas):
+            formula = self.add_formula({'uri': None})
+            for _ in range(components_per_formula):
+                self.add_component(formula['id'])
+
+        for _ in range(blueprints):
+            self.add_blueprint({})
+
+        blueprint_ids = sorted(self.blueprints)
+
+        for _ in range(stacks):
+            stack = self.add_stack({
+                'blueprint': self.random.choice(blueprint_ids) if blueprint_ids else None,
+            }, hosts=hosts_per_stack)
+
+            for i in range(history_per_stack):
+                self.add_history(stack['id'], 'Stack history event {0}'.format(i))
+
+    def add_account(self, data):
+        account_id = self.next_id()
+        account = {
+            'id': account_id,
+            'title': 'account-{0}'.format(account_id),
+            'description': 'Cloud account {0}'.format(account_id),
+            'provider': PROVIDERS[0],
+            'region': REGIONS[0],
+            'vpc_id': None,
+        }
+        account.update(data)
+        self.accounts[account_id] = account
+        return account
+
+    def add_image(self, data):
+        image_id = self.next_id()
+        image = {
+            'id': image_id,
+            'title': 'image-{0}'.format(image_id),
+            'description': 'Image {0}'.format(image_id),
+            'account': None,
+            'image_id': 'ami-{0:08x}'.format(image_id),
+            'default_instance_size': 'm4.large',
+            'ssh_user': 'root',
+        }
+        image.update(data)
+        self.images[image_id] = image
+        return image
+
+    def add_snapshot(self, data):
+        snapshot_id = self.next_id()
+        snapshot = {
+            'id': snapshot_id,
+            'title': 'snapshot-{0}'.format(snapshot_id),
+            'description': 'Snapshot {0}'.format(snapshot_id),
+            'account': None,
+            'snapshot_id': 'snap-{0:08x}'.format(snapshot_id),
+            'size_in_gb': 10,
+            'filesystem_type': 'ext4',
+        }
+        snapshot.update(data)
+        self.snapshots[snapshot_id] = snapshot
+        return snapshot
+
+    def add_formula(self, data):
+        formula_id = self.next_id()
+        formula = {
+            'id': formula_id,
+            'title': 'formula-{0}'.format(formula_id),
+            'description': 'Formula {0}'.format(formula_id),
+            'uri': 'https://github.com/stackdio-formulas/formula-{0}.git'.format(formula_id),
+            'root_path': 'formula{0}'.format(formula_id),
+            'status': 'complete',
+            'status_detail': 'Import complete',
+            'valid_versions': ['master'],
+        }
+        formula.update((k, v) for k, v in data.items() if v is not None)
+        self.formulas[formula_id] = formula
+        self.components[formula_id] = []
+        return formula
+
+    def add_component(self, formula_id):
+        formula = self.formulas[formula_id]
+        index = len(self.components[formula_id])
+        component = {
+            'title': '{0} component {1}'.format(formula['title'], index),
+            'description': 'Component {0} of {1}'.format(index, formula['title']),
+            'sls_path': '{0}.component{1}'.format(formula['root_path'], index),
+        }
+        self.components[formula_id].append(component)
+        return component
+
+    def add_blueprint(self, data):
+        blueprint_id = self.next_id()
+        formulas = sorted(self.formulas)
+        formula_id = self.random.choice(formulas) if formulas else None
+
+        host_definitions = [{
+            'id': self.next_id(),
+            'title': 'hostdef-{0}'.format(blueprint_id),
+            'description': 'Host definition for blueprint {0}'.format(blueprint_id),
+            'hostname_template': 'host-{index}',
+            'count': 1,
+            'size': 'm4.large',
+            'formula_components': [dict(c, order=0)
+                                   for c in self.components.get(formula_id, [])[:2]],
+        }]
+
+        blueprint = {
+            'id': blueprint_id,
+            'title': 'blueprint-{0}'.format(blueprint_id),
+            'description': 'Blueprint {0}'.format(blueprint_id),
+            'create_users': True,
+            'host_definitions': host_definitions,
+            'properties': {},
+            'labels': {},
+        }
+        blueprint.update(data)
+        self.blueprints[blueprint_id] = blueprint
+        return blueprint
+
+    def add_stack(self, data, hosts=0):
+        stack_id = self.next_id()
+        stack = {
+            'id': stack_id,
+            'title': 'stack-{0}'.format(stack_id),
+            'description': 'Stack {0}'.format(stack_id),
+            'namespace': 'stack{0}'.format(stack_id),
+            'blueprint': None,
+            'status': self.random.choice(STACK_STATUSES),
+            'status_detail': '',
+            'properties': {},
+            'labels': {},
+        }
+        stack.update(data)
+        self.stacks[stack_id] = stack
+        self.hosts[stack_id] = []
+        self.history[stack_id] = []
+        self.security_groups[stack_id] = []
+
+        for index in range(hosts):
+            self.hosts[stack_id].append({
+                'id': self.next_id(),
+                'hostname': 'host-{0}'.format(index),
+                'fqdn': 'host-{0}.{1}.example.com'.format(index, stack['namespace']),
+                'state': self.random.choice(HOST_STATES),
+                'provider_private_dns': 'ip-10-0-0-{0}.ec2.internal'.format(index),
+            })
+
+        blueprint = self.blueprints.get(stack['blueprint'])
+        for host_definition in (blueprint or {}).get('host_definitions', []):
+            self.add_security_group(stack_id, host_definition)
+
+        return stack
+
+    def add_history(self, stack_id, message):
+        self.history[stack_id].append({
+            'event': message,
+            'status': 'finished',
+            'level': 'INFO',
+        })
+
+    def add_security_group(self, stack_id, host_definition):
+        group_id = self.next_id()
+        group = {
+            'id': group_id,
+            'name': 'stackdio-{0}-{1}'.format(stack_id, group_id),
+            'description': 'Managed security group',
+            'group_id': 'sg-{0:08x}'.format(group_id),
+            'blueprint_host_definition': {'title': host_definition['title']},
+            'is_default': False,
+        }
+        self.security_groups.setdefault(stack_id, []).append(group)
+        self.rules[group_id] = [{
+            'protocol': 'tcp',
+            'from_port': 22,
+            'to_port': 22,
+            'rule': '0.0.0.0/0',
+        }]
+        return group
+
+    def add_command(self, stack_id, data):
+        command_id = self.next_id()
+        command = {
+            'id': command_id,
+            'stack': stack_id,
+            'host_target': data.get('host_target'),
+            'command': data.get('command'),
+            'status': 'finished',
+            'std_out': [{'host': host['hostname'], 'output': ''}
+                        for host in self.hosts.get(stack_id, [])],
+        }
+        self.commands[command_id] = command
+        return command
+
+    def get_log(self, stack_id, log_type, level, lines=100):
+        return '\n'.join(
+            '[{0}] {1}.{2} line {3}'.format(stack_id, log_type, level, i)
+            for i in range(lines)
+        ) + '\n'
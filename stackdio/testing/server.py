@@ -0,0 +1,639 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from stackdio.client.compat import ThreadingMixIn, parse_qsl, urlencode
+
+from .data import LOG_TYPES, STACK_ACTIONS, Dataset
+
+STATUS_REASONS = {
+    200: 'OK',
+    201: 'Created',
+    204: 'No Content',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    429: 'Too Many Requests',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class HttpError(Exception):
+
+    def __init__(self, status, detail):
+        super(HttpError, self).__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+class FakeRequest(object):
+    """
+    The bits of the WSGI environ the handlers care about
+    """
+
+    def __init__(self, environ):
+        super(FakeRequest, self).__init__()
+        self.environ = environ
+        self.method = environ['REQUEST_METHOD']
+        self.path = environ.get('PATH_INFO', '')
+        self.query = dict(parse_qsl(environ.get('QUERY_STRING', '')))
+
+        scheme = environ.get('wsgi.url_scheme', 'http')
+        host = environ.get('HTTP_HOST') or '{0}:{1}'.format(environ['SERVER_NAME'],
+                                                            environ['SERVER_PORT'])
+        self.url = '{0}://{1}{2}'.format(scheme, host, self.path)
+
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+
+        self.body = environ['wsgi.input'].read(length) if length else b''
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body.decode('utf-8'))
+        except ValueError:
+            raise HttpError(400, 'JSON parse error')
+
+
+def route(pattern, **methods):
+    return re.compile('^' + pattern + '$'), methods
+
+
+class FakeStackdio(object):
+    """
+    A WSGI app that stands in for a stackd.io server, for exercising and benchmarking the
+    client offline.  It implements the endpoints the client mixins use on top of an
+    in-memory Dataset, with DRF style pagination (``count`` / ``next`` / ``previous`` /
+    ``results``, ``?page=`` and ``?page_size=``) and ETags on every GET.
+
+    Latency and failures can be injected to exercise retries, the circuit breaker and the
+    caches.  Faults are never injected on ``version/``, so clients can always be created.
+
+        app = FakeStackdio(stacks=1000, page_size=50, latency=(0.01, 0.05), throttle_rate=0.1)
+        client = fake_client(app)
+    """
+
+    ROUTES = [
+        route(r'', GET='root'),
+        route(r'version/', GET='get_version'),
+        route(r'user/', GET='get_user', PATCH='update_user'),
+        route(r'user/token/', POST='get_token'),
+
+        route(r'cloud/providers/', GET='list_providers'),
+        route(r'cloud/providers/(?P<provider>[^/]+)/regions/', GET='list_regions'),
+        route(r'cloud/providers/(?P<provider>[^/]+)/regions/(?P<pk>\d+)/', GET='get_region'),
+        route(r'cloud/providers/(?P<provider>[^/]+)/zones/', GET='list_zones'),
+        route(r'cloud/providers/(?P<provider>[^/]+)/zones/(?P<pk>\d+)/?', GET='get_zone'),
+
+        route(r'cloud/(?P<kind>accounts|images|snapshots)/', GET='list_objects',
+              POST='create_object'),
+        route(r'cloud/(?P<kind>accounts|images|snapshots)/(?P<pk>\d+)/', GET='get_object',
+              DELETE='delete_object'),
+        route(r'cloud/security_groups/', POST='create_security_group'),
+
+        route(r'(?P<kind>formulas|blueprints|stacks)/', GET='list_objects',
+              POST='create_object'),
+        route(r'(?P<kind>formulas|blueprints|stacks)/(?P<pk>\d+)/', GET='get_object',
+              DELETE='delete_object'),
+        route(r'(?P<kind>blueprints|stacks)/(?P<pk>\d+)/properties/', GET='get_properties',
+              PUT='update_properties', PATCH='update_properties'),
+        route(r'(?P<kind>blueprints|stacks)/(?P<pk>\d+)/labels/', POST='add_label'),
+        route(r'(?P<kind>blueprints|stacks)/(?P<pk>\d+)/labels/(?P<key>[^/]+)/',
+              PUT='update_label', DELETE='delete_label'),
+
+        route(r'formulas/(?P<pk>\d+)/components/', GET='list_components'),
+        route(r'formulas/(?P<pk>\d+)/action/', POST='formula_action'),
+
+        route(r'blueprints/(?P<pk>\d+)/host_definitions/', GET='list_host_definitions'),
+
+        route(r'stacks/(?P<pk>\d+)/action/', GET='stack_actions', POST='stack_action'),
+        route(r'stacks/(?P<pk>\d+)/commands/', GET='list_commands', POST='run_command'),
+        route(r'commands/(?P<pk>\d+)/', GET='get_command'),
+        route(r'stacks/(?P<pk>\d+)/history/', GET='list_history'),
+        route(r'stacks/(?P<pk>\d+)/hosts/', GET='list_hosts'),
+        route(r'stacks/(?P<pk>\d+)/logs/', GET='list_logs'),
+        route(r'stacks/(?P<pk>\d+)/logs/(?P<log_type>[\w-]+)\.(?P<level>\w+)\.(?P<date>[^/]+)',
+              GET='get_log'),
+        route(r'stacks/(?P<pk>\d+)/security_groups/', GET='list_security_groups'),
+        route(r'security_groups/(?P<pk>\d+)/rules/', GET='list_rules', PUT='update_rules'),
+    ]
+
+    def __init__(self, dataset=None, prefix='/api/', version='0.8.0', page_size=100,
+                 max_page_size=1000, latency=0, error_rate=0.0, error_statuses=(500, 503),
+                 throttle_rate=0.0, retry_after=1, credentials=None, tokens=True, seed=0,
+                 **dataset_kwargs):
+        """
+        :param dataset: The Dataset to serve.  If not given, one is generated from
+                        dataset_kwargs (stacks, hosts_per_stack, blueprints, ...)
+        :param prefix: The path the api lives under
+        :param version: The version reported by ``version/``
+        :param page_size: The default number of objects per page
+        :param max_page_size: The biggest page_size a request may ask for
+        :param latency: Seconds to sleep before every response.  Either a number, or a
+                        (min, max) tuple to pick a random latency for each request.
+        :param error_rate: The fraction of requests that fail with one of error_statuses
+        :param error_statuses: The statuses injected errors are picked from
+        :param throttle_rate: The fraction of requests that get a 429
+        :param retry_after: The Retry-After value sent along with the 429s and 503s.  None
+                            leaves the header off.
+        :param credentials: A (username, password) tuple to require basic auth for.  By
+                            default any (or no) credentials are accepted.
+        :param tokens: Whether ``user/token/`` hands out API tokens.  When False it 404s,
+                       like an older server.
+        :param seed: The seed for the random generators
+        """
+        super(FakeStackdio, self).__init__()
+        self.dataset = dataset or Dataset(seed=seed, **dataset_kwargs)
+        self.prefix = prefix
+        self.version = version
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.credentials = credentials
+        self.tokens = tokens
+
+        # The tokens handed out that are still valid
+        self.issued_tokens = set()
+
+        # How many times a password was checked, i.e. how many times a real server would
+        # have had to run its password hasher
+        self.password_checks = 0
+
+        self.random = random.Random(seed)
+
+        # (method, path, status) for every request served
+        self.request_log = []
+
+        self._lock = threading.Lock()
+
+    def reset_log(self):
+        with self._lock:
+            self.request_log = []
+
+    def count(self, method=None, path=None):
+        """
+        The number of requests served, optionally only the ones matching a method and / or
+        a path regex (matched against the path below the prefix)
+        """
+        with self._lock:
+            log = list(self.request_log)
+
+        return len([
+            entry for entry in log
+            if (method is None or entry[0] == method) and
+               (path is None or re.search(path, entry[1]))
+        ])
+
+    # WSGI plumbing
+
+    def __call__(self, environ, start_response):
+        request = FakeRequest(environ)
+
+        status, headers, body = self.dispatch(request)
+
+        with self._lock:
+            self.request_log.append((request.method, request.path[len(self.prefix):], status))
+
+        start_response('{0} {1}'.format(status, STATUS_REASONS.get(status, 'Unknown')),
+                       headers)
+        return [body]
+
+    def dispatch(self, request):
+        if not request.path.startswith(self.prefix):
+            return self.respond(request, 404, {'detail': 'Not found.'})
+
+        path = request.path[len(self.prefix):]
+
+        if path != 'version/':
+            fault = self.inject_faults()
+            if fault is not None:
+                return fault
+
+        try:
+            self.check_auth(request)
+
+            for pattern, methods in self.ROUTES:
+                match = pattern.match(path)
+                if match is None:
+                    continue
+
+                if request.method not in methods:
+                    raise HttpError(405, 'Method "{0}" not allowed.'.format(request.method))
+
+                handler = getattr(self, methods[request.method])
+                result = handler(request, **match.groupdict())
+
+                if isinstance(result, tuple):
+                    return self.respond(request, *result)
+                return self.respond(request, 200, result)
+
+            raise HttpError(404, 'Not found.')
+        except HttpError as e:
+            return self.respond(request, e.status, {'detail': e.detail})
+
+    def inject_faults(self):
+        """
+        Sleep for the configured latency, and maybe return a throttled or error response
+        """
+        with self._lock:
+            latency = self.latency
+            if isinstance(latency, (tuple, list)):
+                latency = self.random.uniform(*latency)
+            roll = self.random.random()
+            status = self.random.choice(self.error_statuses)
+
+        if latency:
+            time.sleep(latency)
+
+        headers = [('Content-Length', '0')]
+
+        if roll < self.throttle_rate:
+            if self.retry_after is not None:
+                headers.append(('Retry-After', str(self.retry_after)))
+            return 429, headers, b''
+
+        if roll < self.throttle_rate + self.error_rate:
+            if status == 503 and self.retry_after is not None:
+                headers.append(('Retry-After', str(self.retry_after)))
+            return status, headers, b''
+
+        return None
+
+    def revoke_tokens(self):
+        """
+        Invalidate every token handed out so far, as if they all expired
+        """
+        with self._lock:
+            self.issued_tokens = set()
+
+    def check_auth(self, request):
+        header = request.environ.get('HTTP_AUTHORIZATION') or ''
+
+        if header.startswith('Token '):
+            if header[len('Token '):] not in self.issued_tokens:
+                raise HttpError(401, 'Invalid token.')
+            return
+
+        if header.startswith('Basic '):
+            with self._lock:
+                self.password_checks += 1
+
+        if self.credentials is None:
+            return
+
+        expected = '{0}:{1}'.format(*self.credentials).encode('utf-8')
+        expected = 'Basic ' + base64.b64encode(expected).decode('ascii')
+
+        if header != expected:
+            raise HttpError(401, 'Invalid username/password.')
+
+    def respond(self, request, status, body):
+        if status == 204 or body is None:
+            return status, [('Content-Length', '0')], b''
+
+        if isinstance(body, bytes):
+            content_type = 'text/plain; charset=utf-8'
+        else:
+            content_type = 'application/json'
+            body = json.dumps(body).encode('utf-8')
+
+        headers = [('Content-Type', content_type)]
+
+        if request.method == 'GET' and status == 200:
+            etag = '"{0}"'.format(hashlib.md5(body).hexdigest())
+            headers.append(('ETag', etag))
+
+            if request.environ.get('HTTP_IF_NONE_MATCH') == etag:
+                return 304, [('ETag', etag), ('Content-Length', '0')], b''
+
+        headers.append(('Content-Length', str(len(body))))
+
+        return status, headers, body
+
+    def paginate(self, request, objects):
+        try:
+            page = int(request.query.get('page', 1))
+            page_size = min(int(request.query.get('page_size', self.page_size)),
+                            self.max_page_size)
+        except ValueError:
+            raise HttpError(404, 'Invalid page.')
+
+        num_pages = max(1, (len(objects) + page_size - 1) // page_size)
+
+        if page < 1 or page > num_pages or page_size < 1:
+            raise HttpError(404, 'Invalid page.')
+
+        def page_url(number):
+            query = dict(request.query, page=number)
+            return '{0}?{1}'.format(request.url, urlencode(sorted(query.items())))
+
+        return {
+            'count': len(objects),
+            'next': page_url(page + 1) if page < num_pages else None,
+            'previous': page_url(page - 1) if page > 1 else None,
+            'results': objects[(page - 1) * page_size:page * page_size],
+        }
+
+    def get_store(self, kind):
+        return getattr(self.dataset, kind.replace('-', '_'))
+
+    def get_or_404(self, store, pk):
+        try:
+            return store[int(pk)]
+        except (KeyError, ValueError):
+            raise HttpError(404, 'Not found.')
+
+    # Handlers
+
+    def root(self, request):
+        base = request.url
+        return dict((name, base + name + '/') for name in (
+            'version', 'user', 'stacks', 'blueprints', 'formulas', 'cloud'))
+
+    def get_version(self, request):
+        return {'version': self.version}
+
+    def get_user(self, request):
+        return self.dataset.user
+
+    def update_user(self, request):
+        data = request.json()
+        settings = data.pop('settings', None)
+        self.dataset.user.update(data)
+        if settings:
+            self.dataset.user['settings'].update(settings)
+        return self.dataset.user
+
+    def get_token(self, request):
+        if not self.tokens:
+            raise HttpError(404, 'Not found.')
+
+        token = hashlib.sha1('{0}-{1}'.format(id(self), self.dataset.next_id())
+                             .encode('utf-8')).hexdigest()
+
+        with self._lock:
+            self.issued_tokens.add(token)
+
+        return {'token': token}
+
+    def list_providers(self, request):
+        return self.paginate(request, sorted(self.dataset.providers.values(),
+                                             key=lambda p: p['id']))
+
+    def list_regions(self, request, provider):
+        regions = self.dataset.regions.get(provider, {})
+        return self.paginate(request, [regions[pk] for pk in sorted(regions)])
+
+    def get_region(self, request, provider, pk):
+        return self.get_or_404(self.dataset.regions.get(provider, {}), pk)
+
+    def list_zones(self, request, provider):
+        zones = self.dataset.zones.get(provider, {})
+        return self.paginate(request, [zones[pk] for pk in sorted(zones)])
+
+    def get_zone(self, request, provider, pk):
+        return self.get_or_404(self.dataset.zones.get(provider, {}), pk)
+
+    def list_objects(self, request, kind):
+        store = self.get_store(kind)
+        objects = [store[pk] for pk in sorted(store)]
+
+        # Simple exact-match filtering on any field, e.g. ?title=foo
+        filters = dict((k, v) for k, v in request.query.items() if k not in ('page', 'page_size'))
+        if filters:
+            objects = [obj for obj in objects
+                       if all(str(obj.get(k)) == v for k, v in filters.items())]
+
+        return self.paginate(request, objects)
+
+    def create_object(self, request, kind):
+        data = request.json()
+
+        if kind == 'stacks' and data.get('blueprint') not in self.dataset.blueprints:
+            # The same field error the real server gives
+            return 400, {'blueprint': ['Invalid pk "{0}" - object does not '
+                                       'exist.'.format(data.get('blueprint'))]}
+
+        creator = getattr(self.dataset, 'add_' + kind.rstrip('s'))
+        return 201, creator(data)
+
+    def get_object(self, request, kind, pk):
+        return self.get_or_404(self.get_store(kind), pk)
+
+    def delete_object(self, request, kind, pk):
+        store = self.get_store(kind)
+        self.get_or_404(store, pk)
+        del store[int(pk)]
+        return 204, None
+
+    def create_security_group(self, request):
+        data = request.json()
+        group_id = self.dataset.next_id()
+        group = dict(data, id=group_id)
+        self.dataset.rules[group_id] = []
+        return 201, group
+
+    def get_properties(self, request, kind, pk):
+        return self.get_or_404(self.get_store(kind), pk)['properties']
+
+    def update_properties(self, request, kind, pk):
+        obj = self.get_or_404(self.get_store(kind), pk)
+        if request.method == 'PUT':
+            obj['properties'] = request.json()
+        else:
+            obj['properties'].update(request.json())
+        return obj['properties']
+
+    def add_label(self, request, kind, pk):
+        obj = self.get_or_404(self.get_store(kind), pk)
+        data = request.json()
+        obj['labels'][data.get('key')] = data.get('value')
+        return 201, data
+
+    def update_label(self, request, kind, pk, key):
+        obj = self.get_or_404(self.get_store(kind), pk)
+        if key not in obj['labels']:
+            raise HttpError(404, 'Not found.')
+        obj['labels'][key] = request.json().get('value')
+        return {'key': key, 'value': obj['labels'][key]}
+
+    def delete_label(self, request, kind, pk, key):
+        obj = self.get_or_404(self.get_store(kind), pk)
+        if obj['labels'].pop(key, None) is None:
+            raise HttpError(404, 'Not found.')
+        return 204, None
+
+    def list_components(self, request, pk):
+        self.get_or_404(self.dataset.formulas, pk)
+        return self.paginate(request, self.dataset.components[int(pk)])
+
+    def formula_action(self, request, pk):
+        formula = self.get_or_404(self.dataset.formulas, pk)
+        return formula
+
+    def list_host_definitions(self, request, pk):
+        blueprint = self.get_or_404(self.dataset.blueprints, pk)
+        return self.paginate(request, blueprint['host_definitions'])
+
+    def stack_actions(self, request, pk):
+        self.get_or_404(self.dataset.stacks, pk)
+        return {'available_actions': STACK_ACTIONS}
+
+    def stack_action(self, request, pk):
+        stack = self.get_or_404(self.dataset.stacks, pk)
+        action = request.json().get('action')
+        if action not in STACK_ACTIONS:
+            raise HttpError(400, 'Invalid action.')
+        self.dataset.add_history(stack['id'], 'Executing action {0}'.format(action))
+        return {'action': action}
+
+    def list_commands(self, request, pk):
+        stack = self.get_or_404(self.dataset.stacks, pk)
+        commands = [c for c in self.dataset.commands.values() if c['stack'] == stack['id']]
+        return self.paginate(request, sorted(commands, key=lambda c: c['id']))
+
+    def run_command(self, request, pk):
+        stack = self.get_or_404(self.dataset.stacks, pk)
+        return 201, self.dataset.add_command(stack['id'], request.json())
+
+    def get_command(self, request, pk):
+        return self.get_or_404(self.dataset.commands, pk)
+
+    def list_history(self, request, pk):
+        self.get_or_404(self.dataset.stacks, pk)
+        return self.paginate(request, self.dataset.history[int(pk)])
+
+    def list_hosts(self, request, pk):
+        self.get_or_404(self.dataset.stacks, pk)
+        return self.paginate(request, self.dataset.hosts[int(pk)])
+
+    def list_logs(self, request, pk):
+        self.get_or_404(self.dataset.stacks, pk)
+        base = request.url
+        return {
+            'latest': [base + 'latest/{0}.{1}'.format(t, l) for t, l in LOG_TYPES],
+            'historical': [],
+        }
+
+    def get_log(self, request, pk, log_type, level, date):
+        self.get_or_404(self.dataset.stacks, pk)
+        if (log_type, level) not in LOG_TYPES:
+            raise HttpError(404, 'Not found.')
+
+        lines = self.dataset.get_log(pk, log_type, level).splitlines(True)
+
+        tail = request.query.get('tail')
+        if tail and tail.isdigit():
+            lines = lines[-int(tail):]
+
+        return ''.join(lines).encode('utf-8')
+
+    def list_security_groups(self, request, pk):
+        self.get_or_404(self.dataset.stacks, pk)
+        return self.paginate(request, self.dataset.security_groups[int(pk)])
+
+    def list_rules(self, request, pk):
+        return self.paginate(request, self.get_or_404(self.dataset.rules, pk))
+
+    def update_rules(self, request, pk):
+        rules = self.get_or_404(self.dataset.rules, pk)
+        rules.append(request.json())
+        return rules
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def serve(app=None, host='127.0.0.1', port=0):
+    """
+    Serve a FakeStackdio app over real HTTP on a background thread.  Use this to include
+    the network (and the transport) in a benchmark; otherwise fake_client is faster.
+
+    :param app: The app to serve.  A default FakeStackdio is created if not given.
+    :param host: The interface to listen on
+    :param port: The port to listen on.  0 picks a free one.
+    :return: the server.  ``server.url`` is the api url to point a client at, and
+             ``server.shutdown()`` stops it.
+    """
+    app = app or FakeStackdio()
+
+    server = make_server(host, port, app, server_class=ThreadingWSGIServer,
+                         handler_class=QuietHandler)
+    server.url = 'http://{0}:{1}{2}'.format(host, server.server_port, app.prefix)
+    server.app = app
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    return server
+
+
+def fake_client(app=None, **kwargs):
+    """
+    Create a client that calls a FakeStackdio app in-process, without any networking.  Unless
+    told otherwise it uses a config in a fresh temporary directory, with the version check
+    and the disk cache off, so nothing from (or in) the real ~/.stackdio gets involved.
+
+    :param app: The app to call.  A default FakeStackdio is created if not given.
+    :param kwargs: Passed on to StackdioClient
+    :rtype: stackdio.client.StackdioClient
+    """
+    from stackdio.client import StackdioClient
+    from stackdio.client.transport import WSGITransport
+
+    app = app or FakeStackdio()
+
+    kwargs.setdefault('url', 'http://stackdio.test' + app.prefix)
+    kwargs.setdefault('username', 'test')
+    kwargs.setdefault('password', 'password')
+
+    if 'cfg_file' not in kwargs:
+        kwargs['cfg_file'] = os.path.join(tempfile.mkdtemp(prefix='stackdio-test-'),
+                                          'client.cfg')
+        kwargs.setdefault('version_check', False)
+        kwargs.setdefault('disk_cache', False)
+
+    return StackdioClient(transport=WSGITransport(app), **kwargs)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tempfile
+
+import pytest
+from click.testing import CliRunner
+
+from stackdio.cli import stackdio
+from stackdio.testing import FakeStackdio, serve
+from stackdio.testing.server import HttpError
+
+
+class LostCommands(FakeStackdio):
+    """
+    Loses track of every command it runs
+    """
+
+    def get_command(self, request, pk):
+        raise HttpError(404, 'Not found.')
+
+
+@pytest.fixture
+def cli():
+    config_dir = tempfile.mkdtemp()
+    servers = []
+
+    def start(app):
+        server = serve(app)
+        servers.append(server)
+
+        with open(os.path.join(config_dir, 'client.cfg'), 'w') as f:
+            f.write('[stackdio]\nurl = {0}\nusername = test\n'.format(server.url))
+
+        runner = CliRunner(env={'STACKDIO_PASSWORD': 'password'})
+
+        def invoke(*args, **kwargs):
+            app.reset_log()
+            return runner.invoke(stackdio, ['-c', config_dir] + list(args), **kwargs)
+
+        return invoke
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+    shutil.rmtree(config_dir)
+
+
+def first_stack(app):
+    return app.dataset.stacks[min(app.dataset.stacks)]
+
+
+def test_stale_id_is_looked_up_again(cli):
+    app = FakeStackdio(stacks=3)
+    invoke = cli(app)
+    stack = first_stack(app)
+
+    assert invoke('stacks', 'hostnames', stack['title']).exit_code == 0
+
+    # The stack moves to a new id behind the cache's back
+    app.dataset.stacks[9000] = dict(app.dataset.stacks.pop(stack['id']), id=9000)
+    app.dataset.hosts[9000] = app.dataset.hosts[stack['id']]
+
+    result = invoke('stacks', 'hostnames', stack['title'])
+
+    assert result.exit_code == 0
+    assert app.count('GET', '^stacks/9000/hosts/$') == 1
+
+
+def test_command_is_not_run_twice(cli):
+    app = LostCommands(stacks=3)
+    invoke = cli(app)
+    stack = first_stack(app)
+
+    # Get the id into the cache
+    assert invoke('stacks', 'hostnames', stack['title']).exit_code == 0
+
+    result = invoke('stacks', 'run', stack['title'], '*', 'uptime', '-w')
+
+    assert result.exit_code != 0
+    assert app.count('POST', 'stacks/{0}/commands/'.format(stack['id'])) == 1
+
+
+def test_missing_log_keeps_the_cached_id(cli):
+    app = FakeStackdio(stacks=3)
+    invoke = cli(app)
+    stack = first_stack(app)
+
+    assert invoke('stacks', 'hostnames', stack['title']).exit_code == 0
+
+    result = invoke('stacks', 'logs', stack['title'], 'global-orchestration.log.latest')
+
+    assert result.exit_code != 0
+    assert app.count('GET', '^stacks/$') == 0
+
+    # Still cached, so no lookup is needed
+    app.reset_log()
+    assert invoke('stacks', 'hostnames', stack['title']).exit_code == 0
+    assert app.count('GET', '^stacks/$') == 0
+
+
+def test_delete_acts_on_the_current_title(cli):
+    app = FakeStackdio(stacks=3)
+    invoke = cli(app)
+    stack = first_stack(app)
+    title = stack['title']
+
+    assert invoke('stacks', 'hostnames', title).exit_code == 0
+
+    # The cached stack is renamed, and another one takes its old title
+    stack['title'] = 'renamed'
+    other = app.dataset.add_stack({'title': title})
+
+    result = invoke('stacks', 'delete', title, input='y\n')
+
+    assert result.exit_code == 0
+    assert stack['id'] in app.dataset.stacks
+    assert other['id'] not in app.dataset.stacks
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2014,  Digital Reasoning
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from stackdio.client import StackdioClient
+from stackdio.testing import FakeStackdio, serve
+
+SERVERS = 4
+CLIENTS_PER_SERVER = 2
+THREADS = 32
+CALLS = 2000
+
+
+def test_clients_dont_cross_between_threads():
+    """
+    Hammer several clients, each talking to its own server with its own credentials, from a
+    shared thread pool.  Every response has to come from the server the client points at.
+    """
+    config_dir = tempfile.mkdtemp()
+
+    apps = []
+    servers = []
+    clients = []
+
+    for i in range(SERVERS):
+        credentials = ('user{0}'.format(i), 'password{0}'.format(i))
+        app = FakeStackdio(stacks=10, credentials=credentials, seed=i)
+
+        # Tag every stack with the server it lives on
+        for stack in app.dataset.stacks.values():
+            stack['description'] = 'server-{0}'.format(i)
+
+        server = serve(app)
+
+        apps.append(app)
+        servers.append(server)
+
+        for _ in range(CLIENTS_PER_SERVER):
+            clients.append((i, StackdioClient(url=server.url,
+                                              username=credentials[0],
+                                              password=credentials[1],
+                                              cfg_file=os.path.join(config_dir, 'client.cfg'))))
+
+    rand = random.Random(0)
+
+    # Pick every call up front, so the threads share nothing but the clients
+    plan = []
+    for _ in range(CALLS):
+        index, client = rand.choice(clients)
+        plan.append((index, client, rand.choice(sorted(apps[index].dataset.stacks))))
+
+    def call(args):
+        index, client, stack_id = args
+        stack = client.get_stack(stack_id)
+        return stack['id'] == stack_id and stack['description'] == 'server-{0}'.format(index)
+
+    try:
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            results = list(executor.map(call, plan))
+    finally:
+        for _, client in clients:
+            client.close()
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    assert results.count(False) == 0
+    assert len(results) == CALLS